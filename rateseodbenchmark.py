@@ -0,0 +1,295 @@
+'''
+Id:          "$Id: rateseodbenchmark.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: End-to-end benchmark of RatesEODLimits.determineExposure on synthetic exposures, with local stand-ins
+             for Sandra, RRA, legacy and the limits config. Reports wall time, peak memory and per-stage timings,
+             utilization and shock timings against the calls they replaced, and the import time of the entry point.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodbenchmark
+'''
+import sys
+import json
+import time
+import types
+import subprocess
+import resource
+import posixpath
+import tracemalloc
+from contextlib import contextmanager, ExitStack
+from unittest import mock
+
+import qztable
+from qz.core import bobfns
+from qz.tools.gov.lib import logging
+
+from qz.remoterisk.cftc.limits import rateseodlimits, rateseodrra, rateseodlegacy, rateseodlimitsindex, rateseodsnapshots
+from qz.remoterisk.cftc.utils import persistence
+from qz.remoterisk.cftc.limits.rateseodcolumns import EXPOSURES_USD_COL
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.limits.rateseodsynthetic import SyntheticBook, MAPPING_CONFIG, BASE_VTDS, BASE_MEASURES, BASE_ROWS
+from qz.remoterisk.cftc.limits.rateseodcalc import DEFAULT_SHOCK_GRID, LIMIT_VALUE_COL, LIMIT_NAME_COL, SHIFT_COL,\
+    extendUtilization, applyShockGrid
+from qz.remoterisk.cftc.limits.rateseodtimings import startManifest, finishManifest
+
+SCALES = (1, 10, 100)
+STARTUP_MODULE = 'qz.remoterisk.cftc.limits.rateseodlimits'
+# only imported when a run gets to the stage that needs them, importing them at startup is a regression
+DEFERRED_MODULES = ['sandra',
+                    'qz.remoterisk.cftc.limits.rateseodalerts',
+                    'qz.remoterisk.cftc.limits.rateseodsnapshots',
+                    'qz.remoterisk.cftc.limits.rateseodreport',
+                    'qz.remoterisk.cftc.limits.rateseodrra',
+                    'qz.remoterisk.cftc.limits.rateseodlegacy',
+                    'qz.remoterisk.cftc.limits.legacy_exposures',
+                    'qz.remoterisk.cftc.risk.intraday',
+                    'qz.remoterisk.cftc.utils.persistence',
+                    'qz.remoterisk.cftc.limits.rateseodwriter',
+                    'qz.remoterisk.cftc.limits.rateseodsnapshotstore',
+                    'qz.remoterisk.cftc.limits.rateseodplanner',
+                    'qz.remoterisk.cftc.limits.rateseodlimitsindex',
+                    'qz.remoterisk.cftc.configs.limitsconfig',
+                    'asyncio',
+                    'concurrent.futures']
+
+logger = logging.getLogger(__name__)
+
+
+class StandInSandra(object):
+    '''
+    Sandra writes are only counted.
+    '''
+    
+    def __init__(self):
+        self.db = types.SimpleNamespace(join=posixpath.join)
+        self.writes = 0
+        
+    def writeExposures(self, db, path, contents, runHour):
+        self.writes += 1
+
+
+@contextmanager
+def moduleStandIn(name, module):
+    '''
+    Serve module as sys.modules[name] and put back only that entry after, the modules imported by the run
+    stay imported.
+    '''
+    missing = object()
+    original = sys.modules.get(name, missing)
+    sys.modules[name] = module
+    try:
+        yield module
+    finally:
+        if original is missing:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = original
+
+@contextmanager
+def standIns(book, **options):
+    '''
+    Route the sources, limits, configs, Sandra and the notifications of rateseodlimits to local stand-ins.
+
+    :param SyntheticBook book: synthetic data
+    :param options: config settings of the run, e.g. vtd_workers or async_sources
+    '''
+    sandra = StandInSandra()
+    legacy = types.SimpleNamespace(fetch=lambda querySet, hour, cfg: (book.legacyTable(book.vtdOf(cfg), querySet['Measure']), None))
+    
+    def fetchExposuresEOD(cfg, querySet, filter):
+        return book.rraTable(book.vtdOf(cfg), querySet['Measure'])
+    
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(rateseodrra, 'fetch_exposures_eod', fetchExposuresEOD))
+        stack.enter_context(mock.patch.object(rateseodlegacy, 'legacy_exposures', legacy))
+        stack.enter_context(mock.patch.object(rateseodlimitsindex, 'limitsconfig', types.SimpleNamespace(RATESLIMITS=book.limits())))
+        stack.enter_context(mock.patch.object(rateseodlimits, 'loadConfig', lambda name: book.loadConfig(name, **options)))
+        # sandra, the writers and the snapshot reader are imported by rateseodlimits on first use
+        stack.enter_context(moduleStandIn('sandra', sandra))
+        stack.enter_context(mock.patch.object(persistence, 'writeExposures', sandra.writeExposures))
+        stack.enter_context(mock.patch.object(rateseodsnapshots, 'combineWithEarlierSnapshots', lambda cfg, hour, snapshots, level: snapshots))
+        stack.enter_context(mock.patch.object(rateseodlimits, 'notifyEODEmptyMeasureExposures', lambda *args, **kwargs: None))
+        stack.enter_context(mock.patch.object(rateseodlimits, 'notifyCFTCReportFailure', lambda *args, **kwargs: None))
+        yield sandra
+
+def benchmark(scale=1, vtds=BASE_VTDS, measures=BASE_MEASURES, rows=BASE_ROWS, traceMemory=True, **options):
+    '''
+    Run determineExposure once on synthetic data, with rows scaled by scale.
+
+    :param int scale: multiple of the base row count
+    :param bool traceMemory: trace the python allocations for the peak memory, tracing slows allocation heavy stages
+    :param options: config settings of the run, e.g. vtd_workers or async_sources
+    :returns: volume, wall time, peak memory and per-stage timings of the run
+    :rtype: dict
+    '''
+    book = SyntheticBook(vtds, measures, rows * scale)
+    with standIns(book, **options) as sandra:
+        limitsCalc = rateseodlimits.RatesEODLimits(MAPPING_CONFIG, useCache=False)
+        manifest = startManifest(MAPPING_CONFIG)
+        if traceMemory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            limitsCalc.determineExposure()
+            wallSeconds = time.perf_counter() - start
+            peakBytes = tracemalloc.get_traced_memory()[1] if traceMemory else 0
+        finally:
+            if traceMemory:
+                tracemalloc.stop()
+            finishManifest()
+    return {'scale': scale,
+            'vtds': vtds,
+            'measures': measures,
+            'exposure_rows': vtds * measures * rows * scale,
+            'wall_seconds': round(wallSeconds, 3),
+            'peak_traced_mb': round(peakBytes / 2.0 ** 20, 1),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+            'writes': sandra.writes,
+            'stages': manifest.totals()}
+
+def bestOf(repeat, fn, *args):
+    '''
+    :returns: fastest wall time of repeat calls of fn
+    :rtype: float
+    '''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return round(best, 4)
+
+def splitShock(expTable, cols):
+    '''
+    shiftCalculation before the shock grid: the M10 and P10 rows are split from the others, shifted with extendExprs
+    and concatenated back.
+    '''
+    mask = expTable[LIMIT_NAME_COL].contains('M10%') | expTable[LIMIT_NAME_COL].contains('P10%')
+    shocked = expTable[mask].extendExprs([f'{EXPOSURES_USD_COL}*{SHIFT_COL}'], ['Exposures_Vega'], ['double'])\
+                            .project([EXPOSURES_USD_COL], exclude=True)\
+                            .rename(['Exposures_Vega'], [EXPOSURES_USD_COL])\
+                            .project(cols)
+    return qztable.vConcat([shocked, expTable[~mask].project(cols)])
+
+def calcTimings(rows, repeat=3):
+    '''
+    Utilization and default shock grid on a joined exposure qztable of rows rows, against the calls they replaced:
+    the utilization lambda of extend, and the split and concatenation of shiftCalculation.
+
+    :param int rows: rows of the joined table, e.g. the exposure rows of a scale
+    :returns: best of repeat timings in seconds
+    :rtype: dict
+    '''
+    joinedRows = SyntheticBook().joinedRows(rows)
+    cols = [col for col in joinedRows[0] if col not in ['Calculation Level', SHIFT_COL]]
+    table = tableFromListOfDicts(joinedRows)
+    # a zero limit fails the lambda, the rows of the book with a zero limit are left out of its timing
+    nonZero = table[~(table[LIMIT_VALUE_COL] == 0.0)]
+    return {'rows': rows,
+            'utilization_lambda': bestOf(repeat, lambda: nonZero.extend(lambda exp, value: abs(exp/value*100),
+                                                                       [EXPOSURES_USD_COL, LIMIT_VALUE_COL], 'Utilization', 'double')),
+            'utilization': bestOf(repeat, extendUtilization, table),
+            'shock_split': bestOf(repeat, splitShock, table, cols),
+            'shock_grid': bestOf(repeat, applyShockGrid, table, DEFAULT_SHOCK_GRID, cols)}
+
+def calcReport(timings):
+    '''
+    :returns: text report of calcTimings, with the speedups against the replaced calls
+    :rtype: str
+    '''
+    lines = []
+    for result in timings:
+        lines.append('%d rows' % result['rows'])
+        for name, beforeKey, afterKey in [('utilization', 'utilization_lambda', 'utilization'),
+                                          ('shock grid', 'shock_split', 'shock_grid')]:
+            lines.append('  %-12s %9.4fs before %9.4fs after %7.1fx' % (
+                name, result[beforeKey], result[afterKey], result[beforeKey] / max(result[afterKey], 1e-9)))
+    return '\n'.join(lines)
+
+def importTimes(module=STARTUP_MODULE, top=15):
+    '''
+    -X importtime breakdown of importing module in a fresh interpreter.
+
+    :param int top: number of slowest imports to report
+    :returns: total import time, slowest imports by cumulative time and deferred modules imported at startup
+    :rtype: dict
+    '''
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], capture_output=True, text=True)
+    if proc.returncode:
+        logger.error('Import of %s failed: %s', module, proc.stderr.splitlines()[-1:])
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        selfUs, cumulativeUs, name = line[len('import time:'):].split('|')
+        imports.append({'module': name.strip(), 'self_us': int(selfUs), 'cumulative_us': int(cumulativeUs)})
+    imported = set(entry['module'] for entry in imports)
+    total = [entry['cumulative_us'] for entry in imports if entry['module'] == module]
+    return {'module': module,
+            'total_us': total[0] if total else sum(entry['self_us'] for entry in imports),
+            'slowest': sorted(imports, key=lambda entry: entry['cumulative_us'], reverse=True)[:top],
+            'deferred_imported': [name for name in DEFERRED_MODULES if name in imported]}
+
+def importReport(startup):
+    '''
+    :returns: text report of importTimes
+    :rtype: str
+    '''
+    lines = ['import %s: %.3fs' % (startup['module'], startup['total_us'] / 1e6)]
+    for entry in startup['slowest']:
+        lines.append('  %-60s %9.3fs cumulative %9.3fs self' % (entry['module'], entry['cumulative_us'] / 1e6, entry['self_us'] / 1e6))
+    if startup['deferred_imported']:
+        lines.append('deferred modules imported at startup: %s' % ', '.join(startup['deferred_imported']))
+    return '\n'.join(lines)
+
+def report(results):
+    '''
+    :returns: text report of benchmark results
+    :rtype: str
+    '''
+    lines = ['%6s %10s %10s %12s %12s' % ('scale', 'rows', 'wall(s)', 'peak(MB)', 'maxrss(MB)')]
+    for result in results:
+        lines.append('%5dx %10d %10.2f %12.1f %12.1f' % (result['scale'], result['exposure_rows'], result['wall_seconds'],
+                                                        result['peak_traced_mb'], result['max_rss_mb']))
+    for result in results:
+        lines.append('')
+        lines.append('%dx stages' % result['scale'])
+        for stage, total in result['stages'].items():
+            lines.append('  %-24s %5d calls %9.3fs total %8.3fs max %10d rows' % (
+                stage, total['calls'], total['seconds'], total['max_seconds'], total['rows']))
+    return '\n'.join(lines)
+
+def run(scales=SCALES, vtds=BASE_VTDS, measures=BASE_MEASURES, rows=BASE_ROWS, output=None, traceMemory=True, startup=True,
+        calc=True, **options):
+    '''
+    Benchmark the pipeline at every scale, 1x being the volume of an hourly run today, and the startup of the entry point.
+    max_rss_mb is the peak of the process so far, peak_traced_mb the peak of the python allocations of the scale.
+
+    :param list scales: multiples of the base row count
+    :param str output: optional path of a JSON file with the results
+    :param bool traceMemory: False to time the runs without tracing the python allocations
+    :param bool startup: False to skip the import time report
+    :param bool calc: False to skip the utilization and shock timings
+    :param options: config settings of the runs, e.g. vtd_workers, async_sources or stand_in_sources
+                    to serve the sources with the latencies and failures of a stand-in file
+    :returns: results per scale
+    :rtype: list
+    '''
+    results = []
+    for scale in scales:
+        logger.info('Benchmarking %sx: %s VTDs, %s measures, %s rows per measure', scale, vtds, measures, rows * scale)
+        results.append(benchmark(int(scale), int(vtds), int(measures), int(rows), traceMemory, **options))
+    logger.info('Pipeline:\n%s', report(results))
+    calcResults = [calcTimings(result['exposure_rows']) for result in results] if calc else None
+    if calcResults is not None:
+        logger.info('Calc:\n%s', calcReport(calcResults))
+    startupTimes = importTimes() if startup else None
+    if startupTimes is not None:
+        logger.info('Startup:\n%s', importReport(startupTimes))
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'runs': results, 'calc': calcResults, 'startup': startupTimes}, f, indent=2)
+    return results
+
+def main():
+    logging.compliance(__name__, "Bob Run", action=logging.Action.ENTRYPOINT)
+    bobfns.run(run)
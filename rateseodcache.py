@@ -0,0 +1,133 @@
+'''
+Id:          "$Id: rateseodcache.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Local on-disk cache of the Rates EOD source fetch results, size bounded with LRU eviction and a TTL.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodcache
+'''
+import os
+import time
+import pickle
+import hashlib
+import threading
+
+from qz.tools.gov.lib import logging
+
+DEFAULT_CACHE_MAX_MB = 512
+DEFAULT_CACHE_TTL_HOURS = 24
+
+logger = logging.getLogger(__name__)
+
+
+class ExposureCache(object):
+    '''
+    Pickled fetch results keyed by (source, VTD, measure, COB date, snap hour).
+    File mtime is the time the entry was written (TTL), access time is refreshed on every hit (LRU).
+    '''
+    
+    def __init__(self, root, maxBytes, ttlSeconds):
+        self.root = root
+        self.maxBytes = maxBytes
+        self.ttlSeconds = ttlSeconds
+        self.lock = threading.Lock()
+        
+    def path(self, key):
+        return os.path.join(self.root, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pkl')
+        
+    def get(self, key):
+        '''
+        :returns: cached value, None on a miss or an expired entry
+        '''
+        path = self.path(key)
+        try:
+            mtime = os.path.getmtime(path)
+            if time.time() - mtime > self.ttlSeconds:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path, (time.time(), mtime))
+            return value
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        
+    def put(self, key, value):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(key)
+        tmpPath = path + '.%s.tmp' % threading.get_ident()
+        with open(tmpPath, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, path)
+        self.evict()
+        
+    def evict(self):
+        '''
+        Remove expired entries, then the least recently used ones until the cache fits in maxBytes.
+        '''
+        with self.lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttlSeconds:
+                    self.remove(path)
+                else:
+                    entries.append((stat.st_atime, stat.st_size, path))
+            size = sum(entry[1] for entry in entries)
+            for atime, entrySize, path in sorted(entries):
+                if size <= self.maxBytes:
+                    break
+                self.remove(path)
+                size -= entrySize
+                
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def exposureCache(cfg, useCache=True):
+    '''
+    :returns: exposure cache configured with exposure_cache_dir, None when not configured or bypassed
+    :rtype: ExposureCache
+    '''
+    root = cfg.get('exposure_cache_dir', None)
+    if not root or not useCache:
+        return None
+    return ExposureCache(root,
+                         cfg.get('exposure_cache_max_mb', DEFAULT_CACHE_MAX_MB) * 1024 * 1024,
+                         cfg.get('exposure_cache_ttl_hours', DEFAULT_CACHE_TTL_HOURS) * 3600)
+
+def cacheKey(key, name, measure, jobTimeStamp):
+    return (key, name, measure, jobTimeStamp.strftime('%Y%m%d'), jobTimeStamp.hour)
+
+def cachedMeasureFetch(cache, key, name, jobTimeStamp, fetch):
+    '''
+    Wrap a per-measure fetch with the exposure cache. Measures without exposures are not cached,
+    so a rerun picks them up once the source recovers.
+
+    :param ExposureCache cache: exposure cache, the fetch is returned as is when None
+    :param callable fetch: per-measure fetch returning (snapshot table, exposure table)
+    :rtype: callable
+    '''
+    if cache is None:
+        return fetch
+    
+    def fetchCached(measure):
+        measureKey = cacheKey(key, name, measure, jobTimeStamp)
+        tables = cache.get(measureKey)
+        if tables is not None:
+            logger.info('Using cached exposures for %s', measureKey)
+            return tables
+        tables = fetch(measure)
+        if tables[1]:
+            cache.put(measureKey, tables)
+        return tables
+    
+    return fetchCached
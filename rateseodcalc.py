@@ -0,0 +1,88 @@
+'''
+Id:          "$Id: rateseodcalc.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Utilization and shock arithmetic for the Rates EOD limits.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodcalc
+'''
+from qz.remoterisk.cftc.limits.rateseodcolumns import MEASURE_COL, EXPOSURES_USD_COL
+
+LIMIT_VALUE_COL = 'Limit Value'
+LIMIT_NAME_COL = 'Limit Name'
+SHIFT_COL = 'Shift_Name'
+SHOCKED_COL = 'Exposures_Shocked'
+# 10% shock for M10 and P10 limits, used when the config has no shock_grid. Matched by limit name for every measure
+# as the shiftCalculation before the grid did: its `and` never applied the IR Vega test.
+DEFAULT_SHOCK_GRID = [{'limit_names': ['M10%', 'P10%']}]
+
+
+def rowUtilization(exp, value):
+    '''
+    abs(exp/value*100) for a single row, NaN for a zero or missing limit.
+    '''
+    if not value:
+        return float('nan')
+    return abs(exp/value*100)
+
+def extendUtilization(expTable):
+    '''
+    Add the Utilization column to a table with Exposures_USD and Limit Value.
+    Rows with a zero or missing limit get a NaN utilization instead of failing the run.
+
+    :param qztable expTable: exposures joined with limits
+    :rtype: qztable
+    '''
+    from qz.remoterisk.cftc.utils.persistence import UTILIZATION_COL
+    return expTable.extend(rowUtilization, [EXPOSURES_USD_COL, LIMIT_VALUE_COL], UTILIZATION_COL, 'double')
+
+def checkShockGridEntry(entry):
+    if entry.get('measure') is None and not entry.get('limit_names'):
+        raise ValueError(f'shock_grid entry {entry} needs a measure or limit_names')
+
+def shockGridMatch(entry, measure, limitName):
+    '''
+    True when a grid entry applies to a row: the entry matches the rows whose Limit Name contains one of its
+    limit_names, restricted to its measure when measure is set.
+    '''
+    if entry.get('measure') is not None and measure != entry['measure']:
+        return False
+    if entry.get('limit_names'):
+        return limitName is not None and any(name in limitName for name in entry['limit_names'])
+    return True
+
+def shockedExposure(shockGrid):
+    '''
+    Row function of the shocked Exposures_USD: the exposure shifted by the first grid entry matching the row, by its
+    shift or by the Shift_Name of the limit when shift is not set, and the exposure as is when no entry matches.
+
+    :param list shockGrid: [{'measure': ..., 'limit_names': [...], 'shift': ...}]
+    :returns: fn(exposure, measure, limitName, limitShift)
+    :rtype: callable
+    '''
+    def shocked(exposure, measure, limitName, limitShift=None):
+        for entry in shockGrid:
+            if shockGridMatch(entry, measure, limitName):
+                return exposure * (entry['shift'] if 'shift' in entry else limitShift)
+        return exposure
+    return shocked
+
+def applyShockGrid(expTable, shockGrid, cols):
+    '''
+    Shock the exposures of the rows matched by the grid and project on cols, in a single extend over the table
+    whatever the number of grid entries. A grid entry matches on the Measure and Limit Name of the aggregated rows,
+    there is no tenor column to shock per tenor.
+
+    :param qztable expTable: exposures joined with limits
+    :param list shockGrid: shock grid, see shockedExposure
+    :param list cols: columns of the result
+    :returns: table with the shocked Exposures_USD
+    :rtype: qztable
+    '''
+    for entry in shockGrid:
+        checkShockGridEntry(entry)
+    shockCols = [EXPOSURES_USD_COL, MEASURE_COL, LIMIT_NAME_COL]
+    if any('shift' not in entry for entry in shockGrid):
+        shockCols.append(SHIFT_COL)
+    return expTable.extend(shockedExposure(shockGrid), shockCols, SHOCKED_COL, 'double')\
+                   .project([EXPOSURES_USD_COL], exclude=True)\
+                   .rename([SHOCKED_COL], [EXPOSURES_USD_COL])\
+                   .project(cols)
@@ -0,0 +1,15 @@
+'''
+Id:          "$Id: rateseodcolumns.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Exposure column names of the Rates EOD limits, the values of qz.remoterisk.cftc.utils.persistence without
+             importing persistence and its writers at startup. The names of the persisted contents (EXPOSURES_COL,
+             SNAPSHOTS, SNAPTIME) and UTILIZATION_COL are still imported from persistence where they are used.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodcolumns
+'''
+
+BUS_AREA_COL = 'BusinessArea'
+DESK_COL = 'TradingDesk'
+LETIER1_COL = 'LETier1'
+CURRENCY_COL = 'Currency'
+MEASURE_COL = 'Measure'
+EXPOSURES_USD_COL = 'Exposures_USD'
@@ -0,0 +1,137 @@
+'''
+Id:          "$Id: rateseodconfig.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: CFTCConfStatic resolution of the Rates EOD limits configs, once per process, and the deploy time config bundle.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodconfig
+'''
+import os
+import pickle
+import threading
+import importlib.util
+
+from qz.core import bobfns
+from qz.tools.gov.lib import logging
+from qz.remoterisk.utils.bob_utils import getBobEnvironment
+from qz.remoterisk.cftc.utils.config import CFTCConfStatic
+
+CONFIG_PACKAGE = 'qz.remoterisk.cftc.configs'
+
+logger = logging.getLogger(__name__)
+
+_configs = {}
+_configsLock = threading.Lock()
+
+
+def configFiles():
+    '''
+    Yaml files of the config package. CFTCConfStatic maps config names to files by its own rules, e.g.
+    amrs_linear_rates_eod is read from uat_amrs_linear_rates.yaml, and does not tell which files it read,
+    so a config bundle is checked against all the files of the package.
+
+    :returns: file paths, None if the config package can not be located
+    :rtype: list
+    '''
+    try:
+        spec = importlib.util.find_spec(CONFIG_PACKAGE)
+    except ImportError:
+        spec = None
+    locations = list(spec.submodule_search_locations or []) if spec else []
+    try:
+        return sorted(os.path.join(location, name) for location in locations for name in os.listdir(location)
+                      if name.endswith('.yaml')) or None
+    except OSError:
+        return None
+
+def configSignature():
+    '''
+    Paths and modification times of the config files, changes when a file is edited, added or removed.
+
+    :returns: ((path, mtime), ...), None if the files can not be read
+    :rtype: tuple
+    '''
+    paths = configFiles()
+    if paths is None:
+        return None
+    try:
+        return tuple((path, os.path.getmtime(path)) for path in paths)
+    except OSError:
+        return None
+
+def loadConfig(name):
+    '''
+    CFTCConfStatic for a config, from the config bundle when one was loaded, otherwise resolved on the first load
+    and reused for the life of the process. The config files are only checked when the bundle is loaded.
+
+    :param str name: config name
+    :rtype: CFTCConfStatic
+    '''
+    with _configsLock:
+        cfg = _configs.get(name)
+    if cfg is not None:
+        return cfg
+    cfg = CFTCConfStatic(name)
+    with _configsLock:
+        return _configs.setdefault(name, cfg)
+
+def vtdConfigNames(config, env=None):
+    '''
+    Names of the yaml_mapping config and of all its VTD configs.
+    '''
+    env = env or getBobEnvironment()
+    mapping = loadConfig(config)
+    return [config] + [env + '_' + mapping['yaml_mapping'][name] for name in mapping.get('yaml_mapping', {})]
+
+def compileConfigBundle(config, bundlePath, env=None):
+    '''
+    Resolve the yaml_mapping config and all its VTD configs and save them in a single bundle file.
+
+    :param str config: yaml_mapping config name
+    :param str bundlePath: bundle file to write
+    :param str env: bob environment prefix of the VTD configs, defaults to the current one
+    '''
+    signature = configSignature()
+    if signature is None:
+        raise RuntimeError(f'Files of {CONFIG_PACKAGE} can not be located, the bundle could never be checked against them')
+    configs = dict((name, loadConfig(name)) for name in vtdConfigNames(config, env))
+    with open(bundlePath, 'wb') as f:
+        pickle.dump({'signature': signature, 'configs': configs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    logger.info('Saved %s configs to %s', len(configs), bundlePath)
+
+def loadConfigBundle(bundlePath):
+    '''
+    Seed the configs from a bundle written by compileConfigBundle, to be called before the first loadConfig.
+    A bundle that can not be read, or compiled before a config file changed, is a miss: the configs are then
+    resolved by CFTCConfStatic.
+
+    :returns: number of configs loaded from the bundle
+    :rtype: int
+    '''
+    try:
+        with open(bundlePath, 'rb') as f:
+            bundle = pickle.load(f)
+        bundleSignature, configs = bundle['signature'], bundle['configs']
+    except (OSError, EOFError, pickle.UnpicklingError, TypeError, KeyError) as e:
+        logger.warning('Config bundle %s can not be read, configs are resolved by CFTCConfStatic: %s', bundlePath, e)
+        return 0
+    signature = configSignature()
+    if signature is None:
+        logger.warning('Files of %s can not be located to check the config bundle %s, configs are resolved by CFTCConfStatic',
+                       CONFIG_PACKAGE, bundlePath)
+        return 0
+    if bundleSignature != signature:
+        logger.warning('Config files changed since %s was compiled, configs are resolved by CFTCConfStatic', bundlePath)
+        return 0
+    with _configsLock:
+        _configs.update(configs)
+    logger.info('Loaded %s configs from %s', len(configs), bundlePath)
+    return len(configs)
+
+def run(config='dev_rates_eod_yaml_mapping', bundlePath='rates_eod_configs.bundle', env=None):
+    '''
+    Entry point to precompile the Rates EOD configs at deploy time.
+    '''
+    compileConfigBundle(config, bundlePath, env)
+    
+def main():
+    logging.compliance(__name__, "Bob Run", action=logging.Action.ENTRYPOINT)
+    bobfns.run(run)
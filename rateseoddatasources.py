@@ -4,6 +4,9 @@ Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserv
 Description:
 Test: qz.remoterisk.tests.unittests.cftc.limits.rateseoddatasources
 '''
+import importlib
+import threading
+
 import qzsix
 import qztable
 
@@ -12,17 +15,210 @@ from qz.core import bobfns
 from qz.tools.gov.lib import logging
 from qz.remoterisk.cftc.utils.config import CFTCConfStatic
 from qz.data.where import Where
-from qz.remoterisk.cftc.limits import legacy_exposures
-from qz.remoterisk.cftc.limits.utils import concatenateExpTables
-from qz.remoterisk.cftc.risk.intraday import fetch_exposures_eod
-from qz.remoterisk.cftc.utils.persistence import MEASURE_COL
+from qz.remoterisk.cftc.limits.rateseodtables import ExpTableCollector
+from qz.remoterisk.cftc.limits.rateseodcache import cachedMeasureFetch, exposureCache
+from qz.remoterisk.cftc.limits.rateseodrecordings import recordedMeasureFetch, sourceRecordings
+from qz.remoterisk.cftc.limits.rateseodtimings import timed, rowCount
+
+DEFAULT_MAX_CONCURRENT_FETCHES = 4
+
+# backend of every source key, imported on first use so a run only pays the imports of the sources it fetches.
+# cirt_unified_screen has no client in this package, until the module providing the screen client registers its
+# backend with registerSource the measures of the source are reported missing from it.
+SOURCE_BACKENDS = {
+    'management_rra': 'qz.remoterisk.cftc.limits.rateseodrra.RRABackend',
+    'cirt_rra': 'qz.remoterisk.cftc.limits.rateseodrra.RRABackend',
+    'legacy': 'qz.remoterisk.cftc.limits.rateseodlegacy.LegacyBackend',
+    }
+STAND_IN_BACKEND = 'qz.remoterisk.cftc.limits.rateseodstandins.StandInBackend'
+
+logger = logging.getLogger(__name__)
+
+_backendClasses = {}
+_backendClassesLock = threading.Lock()
     
     
-def dataSourceFactory(cfg, key, dataSources, jobTimeStamp, name):
-    if key in ['management_rra', 'cirt_rra']:
-        return fetchFromRRA(cfg, key, dataSources, jobTimeStamp, name)
-    if key == 'legacy':
-        return fetchFromLegacy(cfg, key, dataSources, jobTimeStamp, name)
+def dataSourceFactory(cfg, key, dataSources, jobTimeStamp, name, useCache=True):
+    backend = sourceBackend(cfg, key)
+    if backend is None:
+        return sourceNotRegistered(key, dataSources, name)
+    return backend(cfg, key, dataSources, jobTimeStamp, name, useCache).fetch()
+
+async def dataSourceFactoryAsync(cfg, key, dataSources, jobTimeStamp, name, useCache=True):
+    '''
+    Awaitable version of dataSourceFactory, all the measures of the source are queried concurrently.
+    '''
+    backend = sourceBackend(cfg, key)
+    if backend is None:
+        return sourceNotRegistered(key, dataSources, name)
+    return await backend(cfg, key, dataSources, jobTimeStamp, name, useCache).fetchAsync()
+
+def registerSource(key, backend):
+    '''
+    Register the backend of a source key.
+
+    :param str key: source key of the sources config
+    :param backend: SourceBackend subclass, or its dotted path to import it on first use
+    '''
+    SOURCE_BACKENDS[key] = backend
+
+def sourceBackend(cfg, key):
+    '''
+    :returns: backend class of the source, the stand-in backend for all the sources when stand_in_sources is set,
+              None when no backend is registered for the source
+    :rtype: type
+    '''
+    if cfg.get('stand_in_sources', None):
+        backend = STAND_IN_BACKEND
+    elif key in SOURCE_BACKENDS:
+        backend = SOURCE_BACKENDS[key]
+    else:
+        return None
+    if not isinstance(backend, str):
+        return backend
+    with _backendClassesLock:
+        if backend not in _backendClasses:
+            moduleName, className = backend.rsplit('.', 1)
+            _backendClasses[backend] = getattr(importlib.import_module(moduleName), className)
+        return _backendClasses[backend]
+
+
+class SourceBackend(object):
+    '''
+    Shared fetch interface of the sources. A backend implements fetchMeasure for a single measure, fetch and
+    fetchAsync run it for all the measures of the source, through the on-disk cache, sequentially or concurrently.
+    '''
+    
+    def __init__(self, cfg, key, dataSources, jobTimeStamp, name, useCache=True):
+        self.cfg = cfg
+        self.key = key
+        self.jobTimeStamp = jobTimeStamp
+        self.name = name
+        self.useCache = useCache
+        self.fieldsDict = createParams(key, dataSources)
+        
+    def measures(self):
+        return self.fieldsDict.get('measure_names',[])
+    
+    def fetchMeasure(self, measure):
+        '''
+        :returns: snapshot table and exposure table with the Measure column, both None if there are no exposures
+        :rtype: tuple
+        '''
+        raise NotImplementedError
+    
+    def measureFetch(self):
+        '''
+        Per-measure fetch, fetch results are cached on disk when exposure_cache_dir is set and useCache is not
+        turned off, and recorded for the stand-in sources when record_sources_dir is set.
+        '''
+        fetch = recordedMeasureFetch(sourceRecordings(self.cfg, self.key, self.name, self.jobTimeStamp), self.fetchMeasure)
+        fetch = cachedMeasureFetch(exposureCache(self.cfg, self.useCache), self.key, self.name, self.jobTimeStamp, fetch)
+        return timedMeasureFetch(self.key, self.name, fetch)
+    
+    def fetch(self):
+        '''
+        :returns: snapshots, exposure table and fieldsDict of the source
+        :rtype: tuple
+        '''
+        fetch = self.measureFetch()
+        measureTables = []
+        for measure in self.measures():
+            measureTables.append((measure,) + fetch(measure))
+        return collectMeasureTables(measureTables, self.fieldsDict)
+    
+    async def fetchAsync(self):
+        fetch = self.measureFetch()
+        measureTables = await fetchMeasuresAsync(fetch, self.measures(), getMaxConcurrentFetches(self.cfg, self.fieldsDict))
+        return collectMeasureTables(measureTables, self.fieldsDict)
+
+
+def callWithDeadline(fetch, timeout):
+    '''
+    Run a blocking fetch on a daemon thread and give up on it after timeout seconds,
+    a hung fetch is left behind and does not keep the process alive. The fetch is not started when
+    the timeout is already used up.
+
+    :param callable fetch: fetch without arguments
+    :param float timeout: seconds, None to wait without deadline
+    :returns: (True, result) when the fetch returned in time, (False, None) otherwise
+    :rtype: tuple
+    '''
+    if timeout is None:
+        return True, fetch()
+    if timeout <= 0:
+        return False, None
+    outcome = {}
+    
+    def target():
+        try:
+            outcome['result'] = fetch()
+        except BaseException as e:
+            outcome['error'] = e
+            
+    thread = threading.Thread(target=target, name='rateseod-fetch', daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        return False, None
+    if 'error' in outcome:
+        raise outcome['error']
+    return True, outcome['result']
+
+async def inDaemonThread(fn, *args):
+    '''
+    asyncio.to_thread on a daemon thread. The threads of the default executor of asyncio are joined at
+    interpreter exit, a fetch abandoned at its deadline there would keep the process alive until it returns.
+
+    :returns: result of fn(*args)
+    '''
+    import asyncio
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def setOutcome(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+            
+    def target():
+        try:
+            result, error = fn(*args), None
+        except BaseException as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(setOutcome, result, error)
+        except RuntimeError:
+            # the loop is closed, the fetch was abandoned at its deadline
+            pass
+        
+    threading.Thread(target=target, name='rateseod-fetch', daemon=True).start()
+    return await future
+
+def sourceMissing(key, dataSources):
+    '''
+    Result of a source that returned nothing, e.g. its fetch missed its deadline: all its measures are missing from it.
+
+    :returns: snapshots, exposure table and fieldsDict
+    :rtype: tuple
+    '''
+    fieldsDict = createParams(key, dataSources)
+    measuresMissingExposures = {}
+    for measure in fieldsDict.get('measure_names',[]):
+        fieldsDict = getMissingMeasures(measuresMissingExposures, measure, fieldsDict)
+    return {}, None, fieldsDict
+
+def sourceNotRegistered(key, dataSources, name):
+    '''
+    Result of a source without a registered backend. The VTD goes on with its other sources, and the measures of
+    the source are reported missing from it in the missing measures alert of the VTD.
+    '''
+    logger.error('No backend registered for source %s of %s, its measures are reported missing. '
+                 'Register one with rateseoddatasources.registerSource', key, name)
+    return sourceMissing(key, dataSources)
 
 def createFilter(cfg):
     filter = Where('DivisionName')==cfg.get('division', 'FICC')
@@ -40,6 +236,29 @@ def createParams(key, dataSources):
         fieldsDict.update(field)
     return fieldsDict
 
+def normalizeSources(sources):
+    '''
+    Sources of a VTD config as {source key: [settings]}. The configs write sources either as a mapping or as
+    a list of single key mappings, e.g. - cirt_unified_screen: [...], settings of a key listed twice are merged.
+
+    :rtype: dict
+    '''
+    if hasattr(sources, 'keys'):
+        return sources
+    dataSources = {}
+    for source in sources or []:
+        for key, settings in source.items():
+            dataSources.setdefault(key, []).extend(settings or [])
+    return dataSources
+
+def sourceWithMeasures(dataSources, key, measures):
+    '''
+    Copy of dataSources where the source key only declares measures, the other settings of the source are kept.
+    '''
+    dataSources = dict(dataSources)
+    dataSources[key] = list(dataSources[key]) + [{'measure_names': list(measures)}]
+    return dataSources
+
 def getMissingMeasures(measuresMissingExposures, measure, fieldsDict):
     '''
     Create {measure:source} dict in case exposures of a measure is missing, and the datasource from which the measure is missing.
@@ -54,56 +273,64 @@ def getMissingMeasures(measuresMissingExposures, measure, fieldsDict):
     fieldsDict.update({'measuresMissingExposures': measuresMissingExposures})
     return fieldsDict
 
-def fetchFromRRA(cfg, key, dataSources, jobTimeStamp, name):
+def collectMeasureTables(measureTables, fieldsDict):
+    '''
+    Build the (snapshots, expTable, fieldsDict) result of a source from the per-measure tables.
+
+    :param list measureTables: (measure, snapshot table, exposure table) in measure_names order
+    :param dict fieldsDict: dict with all information related to VTD
+    :returns: snapshots, exposure table and fieldsDict
+    :rtype: tuple
+    '''
     snapshots = {}
-    expTable = None
+    expTables = ExpTableCollector()
     measuresMissingExposures = {}
-    fieldsDict = createParams(key, dataSources)
-    filter = createFilter(cfg)
-    
-    for measure in fieldsDict.get('measure_names',[]):
-        querySet = {}
-        querySet.update({'Measure':measure})
-        querySet.update(fieldsDict)
-        measureExpTable = fetch_exposures_eod(cfg, querySet,filter)
-        measureExpTable.renameCol(['_'.join([querySet[MEASURE_COL], 'USD'])],['Exposures_USD'])
-        measureExposureTable = measureExpTable.extendConst(measure, MEASURE_COL, 'string')
-        # if measure in ["IR Delta", "IR Vega"] and name == "GLOBAL RATES":
-        #     measureExposureTable = qztable.Table(measureExposureTable.getSchema())
-        #     measureExpTable = qztable.Table(measureExpTable.getSchema())
-        snapshots.update({measure: measureExpTable})
-        expTable = concatenateExpTables(expTable, measureExposureTable)
-        
+    for measure, measureExpTable, measureExposureTable in measureTables:
         #adding missing measures for which exposures are empty.
         if not measureExposureTable:
             fieldsDict = getMissingMeasures(measuresMissingExposures, measure, fieldsDict)
-    return snapshots, expTable, fieldsDict
-        
-def fetchFromLegacy(cfg, key, dataSources, jobTimeStamp, name):
-    snapshots = {}
-    expTable = None
-    measuresMissingExposures = {}
-    fieldsDict = createParams(key, dataSources)
-    
-    for measure in fieldsDict.get('measure_names',[]):
-        querySet = {}
-        querySet.update({'Measure':measure})
-        querySet.update(fieldsDict)
-        querySet.update(cfg.get('rra_query_params', None))
-        querySet['tz'] = jobTimeStamp.tzinfo.zone
-        measureExpTable, expPath = legacy_exposures.fetch(querySet, jobTimeStamp.hour, cfg)
-        #adding missing measures for which exposures are empty.
-        if not measureExpTable:
-            fieldsDict = getMissingMeasures(measuresMissingExposures, measure, fieldsDict)
-            continue
-        measureExposureTable = measureExpTable.extendConst(measure, MEASURE_COL, 'string')
-        # if measure in ["IR Delta", "IR Vega", "Inflation Delta"] and name == "GLOBAL RATES":
-        #     measureExposureTable = qztable.Table(measureExposureTable.getSchema())
-        #     measureExpTable = qztable.Table(measureExpTable.getSchema())
+            # legacy returns no table at all for a missing measure, so there is no snapshot either
+            if measureExpTable is None:
+                continue
         snapshots.update({measure: measureExpTable})
-        expTable = concatenateExpTables(expTable, measureExposureTable)
+        expTables.append(measureExposureTable)
+    return snapshots, expTables.table(), fieldsDict
+
+def timedMeasureFetch(key, name, fetch):
+    '''
+    Record every measure fetch of the source in the run manifest, with the number of exposure rows.
+    '''
+    def timedFetch(measure):
+        with timed('measure_fetch', vtd=name, source=key, measure=measure) as timing:
+            measureExpTable, measureExposureTable = fetch(measure)
+            timing['rows'] = rowCount(measureExposureTable)
+        return measureExpTable, measureExposureTable
+    return timedFetch
+
+async def fetchMeasuresAsync(fetch, measures, maxConcurrentFetches):
+    '''
+    Run the blocking per-measure fetch for all measures at once, at most maxConcurrentFetches at a time.
+
+    :param callable fetch: blocking fetch returning (snapshot table, exposure table) for a measure
+    :param list measures: measure names
+    :param int maxConcurrentFetches: concurrency cap for the source
+    :returns: (measure, snapshot table, exposure table) in measures order
+    :rtype: list
+    '''
+    import asyncio
+    semaphore = asyncio.Semaphore(max(1, maxConcurrentFetches))
+    
+    async def fetchMeasure(measure):
+        async with semaphore:
+            return (measure,) + await inDaemonThread(fetch, measure)
         
-    return snapshots, expTable, fieldsDict
+    return await asyncio.gather(*[fetchMeasure(measure) for measure in measures])
+
+def getMaxConcurrentFetches(cfg, fieldsDict):
+    '''
+    Concurrency cap of a source, max_concurrent_fetches under the source overrides the VTD level setting.
+    '''
+    return fieldsDict.get('max_concurrent_fetches', cfg.get('max_concurrent_fetches', DEFAULT_MAX_CONCURRENT_FETCHES))
     
 def run(config = 'dev_gnlr_amrs_rates_eod'):
     cfg = CFTCConfStatic(config)
@@ -0,0 +1,44 @@
+'''
+Id:          "$Id: rateseodlegacy.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Legacy container backend of the Rates EOD sources.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodlegacy
+'''
+from qz.remoterisk.cftc.limits import legacy_exposures
+from qz.remoterisk.cftc.limits.rateseoddatasources import SourceBackend
+from qz.remoterisk.cftc.limits.rateseodcolumns import MEASURE_COL
+
+
+class LegacyBackend(SourceBackend):
+    '''
+    Per-measure fetch from the legacy containers.
+    '''
+    
+    def fetchMeasure(self, measure):
+        return fetchMeasureFromLegacy(self.cfg, self.fieldsDict, self.jobTimeStamp, measure)
+
+
+def legacyQuerySet(cfg, fieldsDict, jobTimeStamp, measure):
+    querySet = {}
+    querySet.update({'Measure':measure})
+    querySet.update(fieldsDict)
+    querySet.update(cfg.get('rra_query_params', None))
+    querySet['tz'] = jobTimeStamp.tzinfo.zone
+    return querySet
+
+def fetchMeasureFromLegacy(cfg, fieldsDict, jobTimeStamp, measure):
+    '''
+    Fetch the exposures of a single measure from the legacy container.
+
+    :returns: snapshot table and exposure table with the Measure column, both None if there are no exposures
+    :rtype: tuple
+    '''
+    querySet = legacyQuerySet(cfg, fieldsDict, jobTimeStamp, measure)
+    measureExpTable, expPath = legacy_exposures.fetch(querySet, jobTimeStamp.hour, cfg)
+    if not measureExpTable:
+        return None, None
+    measureExposureTable = measureExpTable.extendConst(measure, MEASURE_COL, 'string')
+    # if measure in ["IR Delta", "IR Vega", "Inflation Delta"] and name == "GLOBAL RATES":
+    #     measureExposureTable = qztable.Table(measureExposureTable.getSchema())
+    #     measureExpTable = qztable.Table(measureExpTable.getSchema())
+    return measureExpTable, measureExposureTable
@@ -4,33 +4,75 @@ Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserv
 Description:
 Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodlimits
 '''
-import sandra
-import qztable
+import time
+
 from qz.core import bobfns
 from qz.tools.gov.lib import logging
 
-from qz.data.qztable_utils import tableFromListOfDicts
 from qz.remoterisk.utils.bob_utils import getBobEnvironment
-from qz.remoterisk.cftc.utils.config import CFTCConfStatic
-from qz.remoterisk.cftc.limits.rateseodsnapshots import combineWithEarlierSnapshots
-from qz.remoterisk.cftc.limits.utils import jobTimestamp, notifyEODEmptyMeasureExposures, concatenateExpTables,notifyCFTCReportFailure
+from qz.remoterisk.cftc.limits.rateseodconfig import loadConfig, loadConfigBundle
+from qz.remoterisk.cftc.limits.utils import jobTimestamp, notifyEODEmptyMeasureExposures, notifyCFTCReportFailure
 from qz.remoterisk.cftc.limits.breachcalculator import BreachCalculator
-from qz.remoterisk.cftc.limits.rateseoddatasources import dataSourceFactory
-from qz.remoterisk.cftc.limits.rateseodalerts import alertEmail
-from qz.remoterisk.cftc.configs.limitsconfig import RATESLIMITS
-from qz.remoterisk.cftc.utils.persistence import BUS_AREA_COL, DESK_COL, MEASURE_COL, LETIER1_COL, CURRENCY_COL,\
-    EXPOSURES_COL, EXPOSURES_USD_COL, UTILIZATION_COL, SNAPSHOTS, SNAPTIME, writeExposures
+from qz.remoterisk.cftc.limits.rateseodtables import ExpTableCollector
+from qz.remoterisk.cftc.limits.rateseodcalc import DEFAULT_SHOCK_GRID, applyShockGrid, extendUtilization
+from qz.remoterisk.cftc.limits.rateseoddatasources import dataSourceFactory, dataSourceFactoryAsync, callWithDeadline, createParams, sourceMissing,\
+    sourceWithMeasures, normalizeSources
+from qz.remoterisk.cftc.limits.rateseodtimings import timed, timedCall, rowCount, startManifest, finishManifest
+from qz.remoterisk.cftc.limits.rateseodcolumns import BUS_AREA_COL, DESK_COL, MEASURE_COL, LETIER1_COL, CURRENCY_COL,\
+    EXPOSURES_USD_COL
 
 
 logger = logging.getLogger(__name__)
 
+def alertEmailAccepts(keyword):
+    '''
+    Options that hand alertEmail a new argument are only turned on when the alerts module takes it,
+    checked when the config is loaded rather than failing the email at the end of the run.
+
+    :param str keyword: keyword argument of alertEmail
+    :rtype: bool
+    '''
+    import inspect
+    from qz.remoterisk.cftc.limits.rateseodalerts import alertEmail
+    parameters = inspect.signature(alertEmail).parameters
+    return keyword in parameters or any(parameter.kind == parameter.VAR_KEYWORD for parameter in parameters.values())
+
+class VTDRun(object):
+    '''
+    State of a single VTD while it goes through determineExposure.
+    '''
+    
+    def __init__(self, name, cfg):
+        self.name = name
+        self.cfg = cfg
+        self.fieldsDict = {}
+        self.measuresMissingExposures = {}
+        self.measureSources = {}
+        self.matchedLimits = {}
+        self.unmatchedLimits = {}
+        self.unmatchedExposures = {}
+        self.totalSnapshots = {}
+        self.vtdExpTable = None
+        self.level = None
+        self.levels = []
+        self.snaps = None
+        self.spilled = False
+        self.snapTime = None
+
 class RatesEODLimits(BreachCalculator):
     
-    def __init__(self, config):
+    def __init__(self, config, useCache=True):
         # config = "uat_rates_eod_yaml_mapping"
         self.config = config
+        self.useCache = useCache
         self.finalExpTable = None
         self.snapshotsDict = {}
+        self.spilledSnapshots = None
+        self.writer = None
+        self.writeFailures = {}
+        self.report = None
+        self.reportLevels = []
+        self.runDeadline = None
         self.jobTimestamp = jobTimestamp()
         self.batchTime = self.timeStamp()
         self.bobEnv = getBobEnvironment()
@@ -44,107 +86,389 @@ class RatesEODLimits(BreachCalculator):
         :rtype: qztable
         '''
         
-        limitsTable = tableFromListOfDicts(RATESLIMITS)
-        return limitsTable
+        return self.fetchLimitsIndex().table
+    
+    def fetchLimitsIndex(self):
+        '''
+        to read the limits from limit config file, indexed by calculation level.
+        The index is shared by all the VTDs and runs of the process.
+
+        :rtype: LimitsIndex
+        '''
+        from qz.remoterisk.cftc.limits.rateseodlimitsindex import getLimitsIndex
+        return getLimitsIndex()
     
-    def combineDiffSourceSnapshots(self, snapshots):
+    def combineDiffSourceSnapshots(self, totalSnapshots, snapshots):
+        '''
+        Add the snapshots of a source to the per measure collectors, snapshots from diff datasources
+        are projected on the columns of the first one when the tables are built.
+
+        :param dict totalSnapshots: {measure: ExpTableCollector}
+        :param dict snapshots: {measure: qztable} of the source
+        :returns: updated totalSnapshots
+        :rtype: dict
+        '''
         for key in snapshots.keys():
-            if self.totalSnapshots.get(key,None):
-                snapshotCols = self.totalSnapshots[key].columnNames()
-                expTableCols = snapshots[key].columnNames()
-                # to combine data from 2 diff datasources
-                if snapshotCols != expTableCols:
-                    snapshots[key] = snapshots[key].project(snapshotCols)
-                    
-                self.totalSnapshots[key] = self.totalSnapshots[key].vConcat(snapshots[key])
-            else:
-                self.totalSnapshots[key] = snapshots[key]
-        return self.totalSnapshots
+            totalSnapshots.setdefault(key, ExpTableCollector(alignColumns=True)).append(snapshots[key])
+        return totalSnapshots
         
     
     def determineExposure(self):
-        self.yamlConfig = CFTCConfStatic(self.config)
+        with timed('config_load', config=self.config):
+            self.yamlConfig = loadConfig(self.config)
         logger.info(f"config to be used for the utilization calculation - {self.yamlConfig}")
         self.sender = self.yamlConfig['mail']
         self.recipients = self.yamlConfig['recipients_email']
         self.db = self.yamlConfig['exposure_db']
-        self.dbPath = sandra.db.join(self.yamlConfig['exposure_path'], self.batchTime.runDate)
-        # iterate over vtdNames for given business area
-        for name in self.yamlConfig.get('yaml_mapping', {}):
-            cfg = self.bobEnv + '_' + self.yamlConfig['yaml_mapping'][name]
-            self.cfg = CFTCConfStatic(cfg)
-            dataSources = self.cfg['sources']
-            dataSourceKeys = list(dataSources.keys())
-            self.totalSnapshots = {}
-            self.vtdExpTable = None
-            for sourceKey in dataSourceKeys:
-                snapshotsForSource, expTable, fieldsDict = dataSourceFactory(self.cfg, sourceKey, dataSources, self.jobTimestamp)
-                if expTable:
-                    for key in snapshotsForSource.keys():
-                        #TODO update snapshots for all Levels (LOB, VTD)
-                        snapshotsForSource[key] = self.removeExposureColumn(snapshotsForSource[key])
-                        snapshotsForSource[key] = self.addLegalEntityColumn(snapshotsForSource[key])
-                    # add combinesnapshots method here to add snapshots from diff datasources
-                    self.totalSnapshots = self.combineDiffSourceSnapshots(snapshotsForSource)
-                    
-                    expTable = self.removeExposureColumn(expTable)
-                    expTable = self.addLegalEntityColumn(expTable) 
-                    limitsTable = self.fetchLimits()
-                    #TODO take level from dataSources instead of yaml file
-                    calcLevels = fieldsDict.get('calc_level', None)
-                    
-                    for calcLevel in calcLevels:
-                        calcLevelLimitsTable = limitsTable[limitsTable['Calculation Level'] == calcLevel]
-                        colList = self.addCalcLevelCols(calcLevel)
-                        # get the expTable at the calc level
-                        expTableAtLevel = self.getExpAtCalcLevel(expTable, colList)
-                        calcLevelTable = calcLevelLimitsTable.join(expTableAtLevel, colList, mergeKeyCols=True)
-                        calcLevelTable = self.shiftCalculation(calcLevelTable)
-                        calcLevelTable = calcLevelTable.extend(lambda exp,value: abs(exp/value*100), [EXPOSURES_USD_COL, 'Limit Value'], UTILIZATION_COL, 'double')
-
-                        self.finalExpTable = concatenateExpTables(self.finalExpTable, calcLevelTable)
-                        self.vtdExpTable = concatenateExpTables(self.vtdExpTable, calcLevelTable)
-                        self.level = self.vtdExpTable['Level'].uniqueRows()[0][0]
-            fieldsDict.update({'level': self.level})
-            self.utilizationCalculation()
-            self.snapshotCreation()
-            self.contentsCreation()
-            if fieldsDict.get('measuresMissingExposures',None):
-                logger.info('Measure are missing for %s',self.level)
-                notifyEODEmptyMeasureExposures(fieldsDict,self.regionalTimestamp.runHour,self.cfg)
+        self.dbPath = None
+        runDeadline = self.yamlConfig.get('run_deadline_seconds', None)
+        if runDeadline is not None:
+            self.runDeadline = time.monotonic() + runDeadline
+        names = list(self.yamlConfig.get('yaml_mapping', {}))
+        workers = min(self.yamlConfig.get('vtd_workers', 1), len(names))
+        if self.yamlConfig.get('write_behind', False):
+            from qz.remoterisk.cftc.limits.rateseodwriter import WriteBehindQueue
+            self.writer = WriteBehindQueue(self.yamlConfig.get('write_queue_size', 2))
+        if self.yamlConfig.get('lean_html_report', False):
+            if alertEmailAccepts('htmlBody'):
+                from qz.remoterisk.cftc.limits.rateseodreport import LimitReport
+                self.report = LimitReport()
+            else:
+                logger.warning('lean_html_report is set but alertEmail does not take htmlBody, the email keeps its default body')
+        spillDir = self.yamlConfig.get('snapshot_spill_dir', None)
+        if spillDir:
+            from qz.remoterisk.cftc.limits.rateseodsnapshotstore import SpilledSnapshots
+            self.spilledSnapshots = SpilledSnapshots(spillDir, self.batchTime.runDate, self.batchTime.sandraRunHour)
+        try:
+            # iterate over vtdNames for given business area
+            if workers > 1:
+                logger.info('Processing %s VTDs on %s workers', len(names), workers)
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(self.processVTD, name) for name in names]
+                    vtdRuns = [future.result() for future in futures]
+            else:
+                vtdRuns = [self.processVTD(name) for name in names]
+            self.mergeVTDRuns(vtdRuns)
+        finally:
+            self.flushWrites()
         
-    def utilizationCalculation(self):
+    def flushWrites(self):
         '''
-        In case of fetching exposures from multiple sources for a single limit code, the below will be used to groupBy data at limitcode level
+        Wait for the write-behind queue, and report the VTDs whose exposures could not be written.
         '''
+        if self.writer is None:
+            return
+        writer, self.writer = self.writer, None
+        self.writeFailures = writer.flush()
+        for level, exception in self.writeFailures.items():
+            logger.error('Exposures of %s could not be written: %s', level, exception)
+            timedCall('alert_send', notifyCFTCReportFailure, alert='write_failure', vtd=level)(
+                reportName   = f'CFTC EOD limit based check report - {level} exposures write',
+                exception    = exception,
+                toRecipients = [self.yamlConfig.get('ficc_risk_support_mail',self.sender)],
+                ccRecipients = self.recipients+[self.sender],
+                sender       = self.sender
+                )
         
-        cols = list(self.finalExpTable.columnNames())
+    def processVTD(self, name):
+        '''
+        Fetch, aggregate, snapshot and write the exposures of a single VTD.
+        Only the VTDRun state is touched, so VTDs can be processed concurrently.
+
+        :param str name: VTD name from yaml_mapping
+        :returns: state of the processed VTD
+        :rtype: VTDRun
+        '''
+        cfg = self.bobEnv + '_' + self.yamlConfig['yaml_mapping'][name]
+        with timed('config_load', vtd=name, config=cfg):
+            vtd = VTDRun(name, loadConfig(cfg))
+        dataSources = normalizeSources(vtd.cfg['sources'])
+        vtdExpTables = ExpTableCollector()
+        for sourceKey, (snapshotsForSource, expTable, vtd.fieldsDict) in self.fetchSources(vtd, dataSources):
+            if expTable:
+                for key in snapshotsForSource.keys():
+                    #TODO update snapshots for all Levels (LOB, VTD)
+                    snapshotsForSource[key] = self.removeExposureColumn(snapshotsForSource[key])
+                    snapshotsForSource[key] = self.addLegalEntityColumn(snapshotsForSource[key])
+                # add combinesnapshots method here to add snapshots from diff datasources
+                vtd.totalSnapshots = self.combineDiffSourceSnapshots(vtd.totalSnapshots, snapshotsForSource)
+                
+                expTable = self.removeExposureColumn(expTable)
+                expTable = self.addLegalEntityColumn(expTable) 
+                limitsIndex = self.fetchLimitsIndex()
+                #TODO take level from dataSources instead of yaml file
+                calcLevels = vtd.fieldsDict.get('calc_level', None)
+                
+                for calcLevel in calcLevels:
+                    if not limitsIndex.hasLimits(calcLevel):
+                        logger.info('No limits configured at %s level for %s', calcLevel, name)
+                calcLevels = [calcLevel for calcLevel in calcLevels if limitsIndex.hasLimits(calcLevel)]
+                # get the expTable at every calc level in one pass over the exposures
+                with timed('calc_level_aggregation', vtd=name, source=sourceKey) as timing:
+                    expTablesAtLevels = self.getExpAtCalcLevels(expTable, calcLevels)
+                    timing['rows'] = rowCount(expTable)
+                
+                for calcLevel in calcLevels:
+                    calcLevelLimitsTable = limitsIndex.forCalcLevel(calcLevel)
+                    expTableAtLevel, colList = expTablesAtLevels[calcLevel]
+                    with timed('limits_join', vtd=name, source=sourceKey, calc_level=calcLevel) as timing:
+                        if vtd.cfg.get('hash_limits_join', False):
+                            calcLevelTable = self.hashJoinLimits(vtd, limitsIndex, calcLevel, expTableAtLevel, colList)
+                        else:
+                            calcLevelTable = calcLevelLimitsTable.join(expTableAtLevel, colList, mergeKeyCols=True)
+                        timing['rows'] = rowCount(calcLevelTable)
+                    with timed('shift_calculation', vtd=name, source=sourceKey, calc_level=calcLevel):
+                        calcLevelTable = self.shiftCalculation(calcLevelTable, vtd.cfg.get('shock_grid', DEFAULT_SHOCK_GRID))
+                    calcLevelTable = extendUtilization(calcLevelTable)
+
+                    vtdExpTables.append(calcLevelTable)
+                    if vtd.level is None and calcLevelTable:
+                        vtd.level = calcLevelTable['Level'].uniqueRows()[0][0]
+        vtd.vtdExpTable = vtdExpTables.table()
+        vtd.totalSnapshots = {key: collector.table() for key, collector in vtd.totalSnapshots.items()}
+        if vtd.level is None:
+            # no source returned exposures, nothing to aggregate or write for this VTD
+            logger.info('No exposures found for %s', name)
+            vtd.level = name
+            vtd.vtdExpTable = None
+        else:
+            self.utilizationCalculation(vtd)
+            vtd.levels = [row[0] for row in vtd.vtdExpTable['Level'].uniqueRows()]
+            if self.report is not None:
+                for level in vtd.levels:
+                    self.addReportSection(level, vtd.vtdExpTable, len(vtd.levels) > 1)
+            with timed('snapshot_creation', vtd=name):
+                self.snapshotCreation(vtd)
+            self.contentsCreation(vtd)
+            self.spillSnapshots(vtd)
+        # report the measures missing from every source, not only from the last one
+        vtd.fieldsDict.update({'measuresMissingExposures': vtd.measuresMissingExposures})
+        vtd.fieldsDict.update({'measureSources': vtd.measureSources})
+        if vtd.cfg.get('hash_limits_join', False):
+            for calcLevel, unmatchedLimits in vtd.unmatchedLimits.items():
+                if unmatchedLimits:
+                    logger.info('%s %s limits of %s have no exposures', len(unmatchedLimits), calcLevel, name)
+            vtd.fieldsDict.update({'unmatchedLimits': vtd.unmatchedLimits, 'unmatchedExposures': vtd.unmatchedExposures})
+        vtd.fieldsDict.update({'level': vtd.level})
+        if vtd.fieldsDict.get('measuresMissingExposures',None):
+            logger.info('Measure are missing for %s',vtd.level)
+            with timed('alert_send', alert='missing_measures', vtd=name):
+                notifyEODEmptyMeasureExposures(vtd.fieldsDict,self.regionalTimestamp.runHour,vtd.cfg)
+        return vtd
+    
+    def hashJoinLimits(self, vtd, limitsIndex, calcLevel, expTableAtLevel, colList):
+        '''
+        Join the exposures at a calc level with the limits, and record through the hashed limits index the limit keys
+        without exposures and the exposure keys without limits of the VTD at that calc level. A limit matched by
+        the exposures of any source of the VTD is not reported.
+
+        :returns: exposures joined with the limits
+        :rtype: qztable
+        '''
+        limitsJoin = limitsIndex.join(calcLevel, expTableAtLevel, colList)
+        if limitsJoin.unmatchedExposures:
+            logger.warning('%s %s exposures of %s have no limit, e.g. %s', len(limitsJoin.unmatchedExposures), calcLevel, vtd.name,
+                           dict(zip(colList, limitsJoin.unmatchedExposures[0])))
+        matched = vtd.matchedLimits.setdefault(calcLevel, set())
+        matched.update(limitsJoin.matchedKeys)
+        unmatchedLimits = vtd.unmatchedLimits.get(calcLevel, []) + limitsJoin.unmatchedLimits
+        vtd.unmatchedLimits[calcLevel] = [key for key in dict.fromkeys(unmatchedLimits) if key not in matched]
+        vtd.unmatchedExposures.setdefault(calcLevel, []).extend(limitsJoin.unmatchedExposures)
+        return limitsJoin.table
+    
+    def fetchSources(self, vtd, dataSources):
+        '''
+        Fetch the exposures of a VTD from all its sources. With plan_source_fetches, a measure is only fetched
+        from a lower priority source (source_priority, then the order of sources) when the higher priority sources
+        returned no exposures for it, and it is only reported missing when no source had exposures for it.
+
+        :returns: generator of (source key, (snapshots, exposure table, fieldsDict)) per fetch
+        :rtype: generator
+        '''
+        if not vtd.cfg.get('plan_source_fetches', False):
+            for sourceKey in dataSources.keys():
+                result = self.fetchSource(vtd, sourceKey, dataSources)
+                for measure, sources in result[2].get('measuresMissingExposures', {}).items():
+                    vtd.measuresMissingExposures.setdefault(measure, []).extend(sources)
+                self.recordMeasureSources(vtd, sourceKey, result[2])
+                yield sourceKey, result
+            return
+        from qz.remoterisk.cftc.limits.rateseodplanner import FetchPlan
+        plan = FetchPlan(dataSources, vtd.cfg.get('source_priority', {}))
+        for sourceKey, measures in plan:
+            result = self.fetchSource(vtd, sourceKey, sourceWithMeasures(dataSources, sourceKey, measures))
+            plan.record(sourceKey, measures, result[2].get('measuresMissingExposures', {}))
+            self.recordMeasureSources(vtd, sourceKey, result[2])
+            yield sourceKey, result
+        vtd.measuresMissingExposures = plan.missingMeasures()
+        
+    def recordMeasureSources(self, vtd, sourceKey, fieldsDict):
+        '''
+        Record sourceKey as a source of the measures it returned exposures for.
+        '''
+        missing = fieldsDict.get('measuresMissingExposures', {})
+        for measure in fieldsDict.get('measure_names', []):
+            if measure not in missing:
+                vtd.measureSources.setdefault(measure, []).append(sourceKey)
+    
+    def fetchSource(self, vtd, sourceKey, dataSources):
+        '''
+        Fetch the exposures of a VTD from one source, through the asyncio source layer when async_sources is set.
+        The fetch is bounded by the timeout_seconds of the source (source_timeout_seconds by default) and by
+        what is left of the run_deadline_seconds of the run, all the measures of a source that misses its
+        deadline or fails are reported missing from it, and the VTD goes on with its other sources.
+
+        :returns: snapshots, exposure table and fieldsDict of the source
+        :rtype: tuple
+        '''
+        if vtd.cfg.get('async_sources', False):
+            import asyncio
+            fetch = lambda: asyncio.run(dataSourceFactoryAsync(vtd.cfg, sourceKey, dataSources, self.jobTimestamp, vtd.name, self.useCache))
+        else:
+            fetch = lambda: dataSourceFactory(vtd.cfg, sourceKey, dataSources, self.jobTimestamp, vtd.name, self.useCache)
+        timeout = self.sourceTimeout(vtd, sourceKey, dataSources)
+        if timeout is not None and timeout <= 0:
+            logger.error('Run deadline passed before the fetch of %s from %s, it is skipped', vtd.name, sourceKey)
+            return sourceMissing(sourceKey, dataSources)
+        with timed('source_fetch', vtd=vtd.name, source=sourceKey) as timing:
+            try:
+                finished, result = callWithDeadline(fetch, timeout)
+            except Exception:
+                logger.exception('Fetch of %s from %s failed, its measures are reported missing from it', vtd.name, sourceKey)
+                return sourceMissing(sourceKey, dataSources)
+            timing['rows'] = rowCount(result[1]) if finished else None
+        if not finished:
+            logger.error('Fetch of %s from %s did not finish within %.0fs', vtd.name, sourceKey, timeout)
+            return sourceMissing(sourceKey, dataSources)
+        return result
+    
+    def sourceTimeout(self, vtd, sourceKey, dataSources):
+        '''
+        :returns: seconds the fetch of the source may take, None without deadline
+        :rtype: float
+        '''
+        timeout = createParams(sourceKey, dataSources).get('timeout_seconds', vtd.cfg.get('source_timeout_seconds', None))
+        if self.runDeadline is not None:
+            remaining = self.runDeadline - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+    
+    def mergeVTDRuns(self, vtdRuns):
+        '''
+        Merge the per-VTD results into finalExpTable and snapshotsDict, in yaml_mapping order.
+        A VTD table can hold several Level values and two VTDs can report on the same Level, so the
+        concatenated table is aggregated at limit code level once, after all the VTDs are collected.
+
+        :param list vtdRuns: VTDRun objects returned by processVTD
+        '''
+        finalExpTables = ExpTableCollector()
+        levels = []
+        for vtd in vtdRuns:
+            if vtd.vtdExpTable is None:
+                continue
+            finalExpTables.append(vtd.vtdExpTable)
+            levels.extend(vtd.levels)
+            if vtd.spilled:
+                self.spilledSnapshots.add(vtd.level)
+            else:
+                self.snapshotsDict.update({vtd.level:vtd.snaps})
+        self.reportLevels = list(dict.fromkeys(levels))
+        self.finalExpTable = finalExpTables.table()
+        if len(finalExpTables.tables) > 1:
+            self.finalExpTable = self.aggregateUtilization(self.finalExpTable)
+        if self.report is not None:
+            # the sections of a Level reported by several VTDs were rendered from a single VTD each
+            for level in self.reportLevels:
+                if levels.count(level) > 1:
+                    self.addReportSection(level, self.finalExpTable, True)
+
+    def addReportSection(self, level, expTable, filterLevel):
+        '''
+        Render the report section of a Level from the rows of expTable at that Level.
+
+        :param bool filterLevel: expTable holds other Level values as well
+        '''
+        if filterLevel:
+            expTable = expTable[expTable['Level'] == level]
+        self.report.addSection(level, expTable)
+        
+    def aggregateUtilization(self, expTable):
+        '''
+        In case of fetching exposures from multiple sources for a single limit code, the below will be used to groupBy data at limitcode level
+
+        :param qztable expTable: exposures with utilization
+        :returns: exposures summed at limit code level with utilization recalculated
+        :rtype: qztable
+        '''
+        from qz.remoterisk.cftc.utils.persistence import UTILIZATION_COL
+        cols = list(expTable.columnNames())
         cols.remove(EXPOSURES_USD_COL)
         cols.remove(UTILIZATION_COL)
-        self.finalExpTable = self.finalExpTable.groupBy(cols,f'sum({EXPOSURES_USD_COL})')
-        self.vtdExpTable = self.vtdExpTable.groupBy(cols,f'sum({EXPOSURES_USD_COL})')
-        self.finalExpTable = self.finalExpTable.extend(lambda exp,value: abs(exp/value*100), [EXPOSURES_USD_COL, 'Limit Value'], UTILIZATION_COL, 'double')
-        self.vtdExpTable = self.vtdExpTable.extend(lambda exp,value: abs(exp/value*100), [EXPOSURES_USD_COL, 'Limit Value'], UTILIZATION_COL, 'double')
-        return self.finalExpTable
+        expTable = expTable.groupBy(cols,f'sum({EXPOSURES_USD_COL})')
+        expTable = extendUtilization(expTable)
+        return expTable
+        
+    def utilizationCalculation(self, vtd):
+        '''
+        Aggregate the exposures of a VTD at limit code level.
+        '''
+        vtd.vtdExpTable = self.aggregateUtilization(vtd.vtdExpTable)
+        return vtd.vtdExpTable
     
-    def snapshotCreation(self):
-        currentSnapshots = {SNAPSHOTS:self.totalSnapshots}
+    def snapshotCreation(self, vtd):
+        from qz.remoterisk.cftc.utils.persistence import SNAPSHOTS, SNAPTIME
+        currentSnapshots = {SNAPSHOTS:vtd.totalSnapshots}
         currentSnapshots[SNAPTIME] = self.regionalTimestamp.asDatetime
-        combinedSnapshots = combineWithEarlierSnapshots(self.cfg, self.batchTime.sandraRunHour, currentSnapshots, self.level)
-        self.snaps = self.getSnapsOrderedByCols(combinedSnapshots[SNAPSHOTS])
-        self.snapTime = combinedSnapshots[SNAPTIME]
+        storeDir = self.yamlConfig.get('snapshot_store_dir', None)
+        if storeDir:
+            from qz.remoterisk.cftc.limits.rateseodsnapshotstore import SnapshotStore
+            store = SnapshotStore(storeDir, self.batchTime.runDate, vtd.level)
+            combinedSnapshots = store.combine(vtd.cfg, self.batchTime.sandraRunHour, currentSnapshots, vtd.level)
+        else:
+            from qz.remoterisk.cftc.limits.rateseodsnapshots import combineWithEarlierSnapshots
+            combinedSnapshots = combineWithEarlierSnapshots(vtd.cfg, self.batchTime.sandraRunHour, currentSnapshots, vtd.level)
+        vtd.snaps = self.getSnapsOrderedByCols(combinedSnapshots[SNAPSHOTS])
+        vtd.snapTime = combinedSnapshots[SNAPTIME]
         
-    def contentsCreation(self):
+    def contentsCreation(self, vtd):
         '''
         To create the contents of container to write in to sandra.
 
         '''
-        contents = {EXPOSURES_COL:self.vtdExpTable}
-        contents.update({SNAPSHOTS:self.snaps})
-        contents[SNAPTIME] = self.snapTime
-        dbExpPath = sandra.db.join(self.dbPath, self.level)
-        self.snapshotsDict.update({self.level:contents[SNAPSHOTS]})
-        writeExposures(self.db, dbExpPath, contents, self.batchTime.sandraRunHour)
+        # persistence loads the sandra writers, it is only imported once a VTD gets to its write
+        from qz.remoterisk.cftc.utils.persistence import EXPOSURES_COL, SNAPSHOTS, SNAPTIME, writeExposures
+        contents = {EXPOSURES_COL:vtd.vtdExpTable}
+        contents.update({SNAPSHOTS:vtd.snaps})
+        contents[SNAPTIME] = vtd.snapTime
+        dbExpPath = self.exposurePath(vtd.level)
+        write = timedCall('write_exposures', writeExposures, vtd=vtd.level)
+        if self.writer is not None:
+            self.writer.submit(vtd.level, write, self.db, dbExpPath, contents, self.batchTime.sandraRunHour)
+            return
+        write(self.db, dbExpPath, contents, self.batchTime.sandraRunHour)
+
+    def exposurePath(self, level):
+        '''
+        Sandra path of the exposures of a level. sandra and the writers are imported on the first write,
+        so a run starts fetching without paying for them.
+        '''
+        import sandra
+        if self.dbPath is None:
+            self.dbPath = sandra.db.join(self.yamlConfig['exposure_path'], self.batchTime.runDate)
+        return sandra.db.join(self.dbPath, level)
+
+    def spillSnapshots(self, vtd):
+        '''
+        Write the snapshots of the VTD to snapshot_spill_dir when it is set, so they are not held in memory
+        until alertEmail builds the Exposure_Details attachments.
+        '''
+        if self.spilledSnapshots is None:
+            return
+        self.spilledSnapshots.write(vtd.level, vtd.snaps)
+        vtd.snaps = None
+        vtd.totalSnapshots = {}
+        vtd.spilled = True
 
     def getExpAtCalcLevel(self, expTable, colList):
         '''
@@ -168,6 +492,24 @@ class RatesEODLimits(BreachCalculator):
         colList.append('Level')
         return expTableAtCalcLevel
 
+    def getExpAtCalcLevels(self, expTable, calcLevels):
+        '''
+        Grouping sets aggregation: the exposures are grouped once over the union of the columns of all
+        the calc levels, and every calc level is rolled up from that much smaller table.
+
+        :param qztable expTable: exposure
+        :param list calcLevels: calculation levels
+        :returns: {calcLevel: (final exposure table for the calculation level, join column list)}
+        :rtype: dict
+        '''
+        levelCols = dict((calcLevel, self.addCalcLevelCols(calcLevel)) for calcLevel in calcLevels)
+        if len(levelCols) > 1:
+            groupingCols = []
+            for colList in levelCols.values():
+                groupingCols.extend(col for col in colList if col not in groupingCols)
+            expTable = expTable.groupBy(groupingCols, f'sum({EXPOSURES_USD_COL})')
+        return dict((calcLevel, (self.getExpAtCalcLevel(expTable, colList), colList)) for calcLevel, colList in levelCols.items())
+
     def addCalcLevelCols(self, level):
         '''
         To create column list according to the utilization calculation level.
@@ -191,42 +533,52 @@ class RatesEODLimits(BreachCalculator):
         '''
         To send limit utilization email to reciepients with snapshot attachement.
         '''
+        # the email rendering is only imported once the run gets to the email
+        from qz.remoterisk.cftc.limits.rateseodalerts import alertEmail
         date = self.regionalTimestamp.cobDate
         snapTimeVal = self.regionalTimestamp.snapTime
         tzAbbrForSub = self.regionalTimestamp.tzAbbr
-        alertEmail(self.sender, self.recipients, date, snapTimeVal, tzAbbrForSub, self.finalExpTable, self.snapshotsDict)
+        with timed('alert_email') as timing:
+            timing['rows'] = rowCount(self.finalExpTable)
+            # only the options alertEmail was checked to take when the config was loaded
+            options = {}
+            if self.report is not None:
+                options['htmlBody'] = self.report.render(self.reportLevels, snapTimeVal, tzAbbrForSub)
+            snapshotsDict = self.snapshotsDict if self.spilledSnapshots is None else self.spilledSnapshots
+            alertEmail(self.sender, self.recipients, date, snapTimeVal, tzAbbrForSub, self.finalExpTable, snapshotsDict, **options)
+        if self.spilledSnapshots is not None:
+            self.spilledSnapshots.remove()
         
-    def shiftCalculation(self, expTable):
+    def shiftCalculation(self, expTable, shockGrid=DEFAULT_SHOCK_GRID):
         '''
-        Calculate 10% shock for M10 and P10 IR Vega limits and project on RESULTING_COLS.
+        Apply the shock grid (by default 10% shock for M10 and P10 limits) and project on RESULTING_COLS.
         '''
         RESULTING_COLS = ['Level', 'Limit Name','LETier1', 'Measure', 'Limit Value', 'Exposures_USD']
-        vegaExpTable = expTable[expTable.Measure=='IR Vega' and (expTable['Limit Name'].contains('M10%')| expTable['Limit Name'].contains('P10%'))]
-        negationVegaExpTable = expTable[~(expTable.Measure=='IR Vega' and (expTable['Limit Name'].contains('M10%')| expTable['Limit Name'].contains('P10%')))]\
-                                .project(RESULTING_COLS)
-        
-        vegaMulExpTable = vegaExpTable.extendExprs([f'{EXPOSURES_USD_COL}*Shift_Name'],['Exposures_Vega'], ['double'])\
-                        .project([EXPOSURES_USD_COL], exclude=True)\
-                        .rename(['Exposures_Vega'],[EXPOSURES_USD_COL])\
-                        .project(RESULTING_COLS)
-        
-        expTable = qztable.vConcat([vegaMulExpTable,negationVegaExpTable])
-        return expTable
+        return applyShockGrid(expTable, shockGrid, RESULTING_COLS)
         
-def run(config='dev_rates_eod_yaml_mapping'):
+def run(config='dev_rates_eod_yaml_mapping', configBundle=None, useCache=True):
     '''
     Entry point to store limit data.
     
     :param str config: yaml config name
+    :param str configBundle: optional config bundle precompiled with rateseodconfig
+    :param bool useCache: False to bypass the on-disk exposure cache and fetch everything from the sources
     '''    
+    startManifest(config)
+    manifestDir = None
     try:
         #raise RuntimeError('Test Exception')
-        cfg = CFTCConfStatic(config)
-        obj = RatesEODLimits(config)
+        with timed('config_load', config=config):
+            # the bundle seeds the configs before the first of them is loaded
+            if configBundle:
+                loadConfigBundle(configBundle)
+            cfg = loadConfig(config)
+        manifestDir = cfg.get('run_manifest_dir', None)
+        obj = RatesEODLimits(config, useCache)
         obj.determineExposure()    
         obj.notifyEmail()
     except Exception as e:
-        notifyCFTCReportFailure(
+        timedCall('alert_send', notifyCFTCReportFailure, alert='run_failure')(
             reportName   = 'CFTC EOD limit based check report',
             exception    = e,
             toRecipients = [cfg.get('ficc_risk_support_mail',cfg['mail'])],
@@ -234,6 +586,8 @@ def run(config='dev_rates_eod_yaml_mapping'):
             sender       = cfg['mail']
             )
         raise
+    finally:
+        finishManifest(manifestDir)
     
     
 def main():
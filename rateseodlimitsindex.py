@@ -0,0 +1,131 @@
+'''
+Id:          "$Id: rateseodlimitsindex.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Process wide cache of the Rates limits, indexed by calculation level and join keys.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodlimitsindex
+'''
+import threading
+
+from qz.tools.gov.lib import logging
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.configs import limitsconfig
+
+CALC_LEVEL_COL = 'Calculation Level'
+LEVEL_COL = 'Level'
+
+logger = logging.getLogger(__name__)
+
+_limitsIndex = None
+_limitsIndexLock = threading.Lock()
+
+
+def limitsFingerprint(limits):
+    '''
+    Fingerprint of the limits config, changes when RATESLIMITS is reloaded or limits are added or removed.
+    Limits edited in place keep it, invalidateLimitsIndex has to be called for them.
+    '''
+    return (id(limits), len(limits))
+
+def invalidateLimitsIndex():
+    '''
+    Drop the limits index, the next getLimitsIndex builds it again from RATESLIMITS.
+    '''
+    global _limitsIndex
+    with _limitsIndexLock:
+        _limitsIndex = None
+
+def getLimitsIndex():
+    '''
+    Limits index for the current RATESLIMITS, built once per process and rebuilt when RATESLIMITS is reloaded.
+
+    :rtype: LimitsIndex
+    '''
+    global _limitsIndex
+    limits = limitsconfig.RATESLIMITS
+    fingerprint = limitsFingerprint(limits)
+    with _limitsIndexLock:
+        if _limitsIndex is None or _limitsIndex.fingerprint != fingerprint:
+            logger.info('Building limits index from %s limits', len(limits))
+            _limitsIndex = LimitsIndex(limits, fingerprint)
+        return _limitsIndex
+
+
+class LimitsIndex(object):
+    '''
+    Limits table with per calculation level tables and join key lookups built on first use.
+    '''
+    
+    def __init__(self, limits, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.table = tableFromListOfDicts(limits)
+        self.rowsByCalcLevel = {}
+        for row in limits:
+            self.rowsByCalcLevel.setdefault(row.get(CALC_LEVEL_COL), []).append(row)
+        self.tablesByCalcLevel = {}
+        self.rowsByKeys = {}
+        
+    def hasLimits(self, calcLevel):
+        return calcLevel in self.rowsByCalcLevel
+        
+    def forCalcLevel(self, calcLevel):
+        '''
+        :param str calcLevel: calculation level
+        :returns: limits at the calculation level
+        :rtype: qztable
+        '''
+        if calcLevel not in self.tablesByCalcLevel:
+            self.tablesByCalcLevel[calcLevel] = self.table[self.table[CALC_LEVEL_COL] == calcLevel]
+        return self.tablesByCalcLevel[calcLevel]
+        
+    def forKeys(self, calcLevel, keyCols):
+        '''
+        :param str calcLevel: calculation level
+        :param list keyCols: join columns, e.g. [LETier1, Measure, Level]
+        :returns: {key tuple: [limit rows]} for the limits at the calculation level
+        :rtype: dict
+        '''
+        indexKey = (calcLevel, tuple(keyCols))
+        if indexKey not in self.rowsByKeys:
+            rowsByKey = {}
+            for row in self.rowsByCalcLevel.get(calcLevel, []):
+                rowsByKey.setdefault(tuple(row.get(col) for col in keyCols), []).append(row)
+            self.rowsByKeys[indexKey] = rowsByKey
+        return self.rowsByKeys[indexKey]
+    
+    def join(self, calcLevel, expTable, keyCols):
+        '''
+        Join of the limits at a calculation level with the exposures aggregated at that level, with the keys matched on
+        either side. The joined table is forCalcLevel(calcLevel).join(expTable, keyCols, mergeKeyCols=True), so it keeps
+        the column types of qztable. The limits are indexed once by forKeys and probed with the distinct exposure keys.
+        Only the limits of the levels present in the exposures are reported unmatched, not the limits of other VTDs.
+
+        :param str calcLevel: calculation level
+        :param qztable expTable: exposures at the calculation level
+        :param list keyCols: join columns
+        :rtype: LimitsJoin
+        '''
+        rowsByKey = self.forKeys(calcLevel, keyCols)
+        expKeys = [tuple(key) for key in expTable.project(keyCols).uniqueRows()]
+        matchedKeys = set(key for key in expKeys if key in rowsByKey)
+        unmatchedExposures = [key for key in expKeys if key not in rowsByKey]
+        if LEVEL_COL in keyCols:
+            levelPosition = keyCols.index(LEVEL_COL)
+            levels = set(key[levelPosition] for key in expKeys)
+            unmatchedLimits = [key for key in rowsByKey if key not in matchedKeys and key[levelPosition] in levels]
+        else:
+            unmatchedLimits = [key for key in rowsByKey if key not in matchedKeys]
+        table = self.forCalcLevel(calcLevel).join(expTable, keyCols, mergeKeyCols=True)
+        return LimitsJoin(table, matchedKeys, unmatchedLimits, unmatchedExposures)
+
+
+class LimitsJoin(object):
+    '''
+    Result of LimitsIndex.join: the joined table, the limit keys that matched, and the keys without a match on either side.
+    '''
+    
+    def __init__(self, table, matchedKeys, unmatchedLimits, unmatchedExposures):
+        self.table = table
+        self.matchedKeys = matchedKeys
+        self.unmatchedLimits = unmatchedLimits
+        self.unmatchedExposures = unmatchedExposures
@@ -0,0 +1,88 @@
+'''
+Id:          "$Id: rateseodplanner.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Coverage-aware fetch planning for VTDs with several sources, a measure is only queried from a
+             lower priority source when the higher priority sources returned no exposures for it.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodplanner
+'''
+from qz.tools.gov.lib import logging
+from qz.remoterisk.cftc.limits.rateseoddatasources import createParams
+
+logger = logging.getLogger(__name__)
+
+
+def measureCandidates(dataSources, sourcePriority):
+    '''
+    Sources to query for every measure, in priority order. Sources listed for the measure in source_priority
+    come first, the other sources declaring the measure follow in the order of sources.
+
+    :param dict dataSources: sources of the VTD
+    :param dict sourcePriority: {measure: [source keys]} from source_priority
+    :returns: {measure: [source keys]}
+    :rtype: dict
+    '''
+    candidates = {}
+    for key in dataSources.keys():
+        for measure in createParams(key, dataSources).get('measure_names', []):
+            candidates.setdefault(measure, []).append(key)
+    for measure, sources in candidates.items():
+        priority = [key for key in sourcePriority.get(measure, []) if key in sources]
+        candidates[measure] = priority + [key for key in sources if key not in priority]
+    return candidates
+
+
+class FetchPlan(object):
+    '''
+    Fetch rounds of a VTD. Every round queries each pending measure from its next candidate source,
+    grouped per source, measures with exposures are done and the others move on to the next round.
+    '''
+    
+    def __init__(self, dataSources, sourcePriority=None):
+        self.sourceKeys = list(dataSources.keys())
+        self.candidates = measureCandidates(dataSources, sourcePriority or {})
+        self.tried = {}
+        self.covered = set()
+        
+    def pending(self):
+        return [measure for measure, sources in self.candidates.items()
+                if measure not in self.covered and len(self.tried.get(measure, [])) < len(sources)]
+        
+    def nextRound(self):
+        '''
+        :returns: (source key, measures) to fetch in this round, in the order of sources
+        :rtype: list
+        '''
+        measuresBySource = {}
+        for measure in self.pending():
+            source = self.candidates[measure][len(self.tried.get(measure, []))]
+            measuresBySource.setdefault(source, []).append(measure)
+        return [(key, measuresBySource[key]) for key in self.sourceKeys if key in measuresBySource]
+    
+    def __iter__(self):
+        # rounds are planned lazily, so a round sees what the fetches of the previous one recorded
+        fetchRound = self.nextRound()
+        while fetchRound:
+            for item in fetchRound:
+                yield item
+            fetchRound = self.nextRound()
+            
+    def record(self, sourceKey, measures, measuresMissingExposures):
+        '''
+        Record the outcome of fetching measures from a source.
+
+        :param dict measuresMissingExposures: measures the source returned no exposures for
+        '''
+        for measure in measures:
+            self.tried.setdefault(measure, []).append(sourceKey)
+            if measure not in measuresMissingExposures:
+                self.covered.add(measure)
+            elif len(self.tried[measure]) < len(self.candidates[measure]):
+                logger.info('No exposures for %s from %s, falling back to %s', measure, sourceKey,
+                            self.candidates[measure][len(self.tried[measure])])
+                
+    def missingMeasures(self):
+        '''
+        :returns: {measure: [sources tried]} for the measures no source returned exposures for
+        :rtype: dict
+        '''
+        return {measure: list(sources) for measure, sources in self.tried.items() if measure not in self.covered}
@@ -0,0 +1,90 @@
+'''
+Id:          "$Id: rateseodrecordings.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Recordings of the Rates EOD source fetches, written by a run with record_sources_dir and replayed
+             by the stand-in sources.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodrecordings
+'''
+import os
+import pickle
+import threading
+
+from qz.tools.gov.lib import logging
+
+RECORDING_FORMAT = 1
+
+logger = logging.getLogger(__name__)
+
+
+class SourceRecordings(object):
+    '''
+    Fetched tables of every measure of a source, one file per COB date, VTD, source and measure.
+    '''
+
+    def __init__(self, root, cobDate, name, source):
+        self.name = name
+        self.source = source
+        self.path = os.path.join(root, str(cobDate), name, source)
+
+    def measurePath(self, measure):
+        return os.path.join(self.path, measure.replace('/', '_') + '.pkl')
+
+    def get(self, measure):
+        '''
+        :returns: snapshot table and exposure table recorded for the measure, None if there is no recording
+        :rtype: tuple
+        '''
+        try:
+            with open(self.measurePath(measure), 'rb') as f:
+                recording = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if not isinstance(recording, dict) or recording.get('format') != RECORDING_FORMAT:
+            logger.warning('%s is not a recording of format %s, it is ignored', self.measurePath(measure), RECORDING_FORMAT)
+            return None
+        return recording['tables']
+
+    def put(self, measure, tables):
+        '''
+        :param tuple tables: snapshot table and exposure table fetched for the measure
+        '''
+        os.makedirs(self.path, exist_ok=True)
+        recording = {'format': RECORDING_FORMAT, 'vtd': self.name, 'source': self.source, 'measure': measure,
+                     'tables': tuple(tables)}
+        tmpPath = '%s.%s.tmp' % (self.measurePath(measure), threading.get_ident())
+        with open(tmpPath, 'wb') as f:
+            pickle.dump(recording, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, self.measurePath(measure))
+
+
+def sourceRecordings(cfg, key, name, jobTimeStamp):
+    '''
+    :returns: recordings the fetches of the source are written to, None when record_sources_dir is not set
+    :rtype: SourceRecordings
+    '''
+    root = cfg.get('record_sources_dir', None)
+    if not root:
+        return None
+    return SourceRecordings(root, jobTimeStamp.strftime('%Y%m%d'), name, key)
+
+def recordedMeasureFetch(recordings, fetch):
+    '''
+    Wrap a per-measure fetch so that every fetch result is recorded. A recording that can not be written
+    is logged and does not fail the fetch.
+
+    :param SourceRecordings recordings: recordings of the source, the fetch is returned as is when None
+    :param callable fetch: per-measure fetch returning (snapshot table, exposure table)
+    :rtype: callable
+    '''
+    if recordings is None:
+        return fetch
+
+    def fetchRecorded(measure):
+        tables = fetch(measure)
+        try:
+            recordings.put(measure, tables)
+        except (OSError, pickle.PicklingError):
+            logger.exception('Fetch of %s from %s for %s could not be recorded', measure, recordings.source, recordings.name)
+        return tables
+
+    return fetchRecorded
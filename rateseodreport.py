@@ -0,0 +1,82 @@
+'''
+Id:          "$Id: rateseodreport.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Lean HTML body of the "EOD limit based check" email, rendered section by section as each VTD finishes.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodreport
+'''
+import math
+from html import escape
+from string import Template
+
+from qz.remoterisk.cftc.limits.rateseodcolumns import MEASURE_COL, LETIER1_COL, EXPOSURES_USD_COL
+from qz.remoterisk.cftc.utils.persistence import UTILIZATION_COL
+
+REPORT_COLS = ['Level', 'Limit Name', LETIER1_COL, MEASURE_COL, 'Limit Value', EXPOSURES_USD_COL, UTILIZATION_COL]
+REPORT_HEADERS = ['Level', 'Limit Name', 'LE Tier1', 'Measure', 'Limit Value', 'Exposures_USD', 'Utilization(%)']
+NUMBER_COLS = {'Limit Value', EXPOSURES_USD_COL, UTILIZATION_COL}
+BREACH_UTILIZATION = 100
+
+REPORT_TEMPLATE = Template('''<html><head><meta charset="utf-8"><style>
+body{font-family:Calibri,Arial,sans-serif;font-size:11pt}
+h4{color:#4725E5}
+table{border-collapse:collapse}
+th{background:#D3DBEE;text-align:left}
+th,td{padding:7px}
+td{background:#FDFDFD}
+td.n{text-align:right}
+tr.b td{color:#C00000;font-weight:bold}
+</style></head><body>
+<h2>Exposures for $business: </h2>
+<h4>SnapTime: $snapTime $tzAbbr</h4>
+<table><thead><tr>$headers</tr></thead><tbody>
+$sections</tbody></table>
+</body></html>''')
+HEADERS_HTML = ''.join(f'<th>{escape(header)}</th>' for header in REPORT_HEADERS)
+
+
+def formatValue(col, value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if col in NUMBER_COLS:
+        return f'{value:,.0f}'
+    return escape(str(value))
+
+def renderRow(row):
+    utilization = row[-1]
+    breach = utilization is not None and not math.isnan(utilization) and utilization >= BREACH_UTILIZATION
+    cells = ''.join(f'<td class="n">{formatValue(col, value)}</td>' if col in NUMBER_COLS else f'<td>{formatValue(col, value)}</td>'
+                    for col, value in zip(REPORT_COLS, row))
+    return f'<tr class="b">{cells}</tr>' if breach else f'<tr>{cells}</tr>'
+
+def renderSection(rows):
+    return '\n'.join(renderRow(row) for row in rows) + '\n'
+
+
+class LimitReport(object):
+    '''
+    Report sections are rendered when a VTD's table is ready, the body is only put together for the email.
+    A level shared by several VTDs is rendered again from the merged table once all the VTDs are done.
+    '''
+    
+    def __init__(self):
+        self.sections = {}
+        
+    def addSection(self, level, vtdExpTable):
+        '''
+        Render the section of a level.
+
+        :param str level: VTD level
+        :param qztable vtdExpTable: aggregated exposures of the level
+        '''
+        # rows are unique per limit once aggregated at limit code level
+        self.sections[level] = renderSection(vtdExpTable.project(REPORT_COLS).uniqueRows())
+        
+    def render(self, levels, snapTime, tzAbbr, business='Rates'):
+        '''
+        :param list levels: levels in report order, levels without a section are left out
+        :returns: html body of the email
+        :rtype: str
+        '''
+        return REPORT_TEMPLATE.substitute(business=escape(business), snapTime=escape(str(snapTime)), tzAbbr=escape(str(tzAbbr)),
+                                          headers=HEADERS_HTML,
+                                          sections=''.join(self.sections[level] for level in levels if level in self.sections))
@@ -0,0 +1,44 @@
+'''
+Id:          "$Id: rateseodrra.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: RRA backend of the Rates EOD sources, for management_rra and cirt_rra.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodrra
+'''
+from qz.remoterisk.cftc.limits.rateseoddatasources import SourceBackend, createFilter
+from qz.remoterisk.cftc.risk.intraday import fetch_exposures_eod
+from qz.remoterisk.cftc.limits.rateseodcolumns import MEASURE_COL
+
+class RRABackend(SourceBackend):
+    '''
+    Per-measure RRA fetch.
+    '''
+    
+    def __init__(self, cfg, key, dataSources, jobTimeStamp, name, useCache=True):
+        super(RRABackend, self).__init__(cfg, key, dataSources, jobTimeStamp, name, useCache)
+        self.filter = createFilter(cfg)
+        
+    def fetchMeasure(self, measure):
+        return fetchMeasureFromRRA(self.cfg, self.fieldsDict, self.filter, measure)
+
+
+def rraQuerySet(fieldsDict, measure):
+    querySet = {}
+    querySet.update({'Measure':measure})
+    querySet.update(fieldsDict)
+    return querySet
+
+def fetchMeasureFromRRA(cfg, fieldsDict, filter, measure):
+    '''
+    Fetch the exposures of a single measure from RRA.
+
+    :returns: snapshot table and exposure table with the Measure column
+    :rtype: tuple
+    '''
+    querySet = rraQuerySet(fieldsDict, measure)
+    measureExpTable = fetch_exposures_eod(cfg, querySet,filter)
+    measureExpTable.renameCol(['_'.join([querySet[MEASURE_COL], 'USD'])],['Exposures_USD'])
+    measureExposureTable = measureExpTable.extendConst(measure, MEASURE_COL, 'string')
+    # if measure in ["IR Delta", "IR Vega"] and name == "GLOBAL RATES":
+    #     measureExposureTable = qztable.Table(measureExposureTable.getSchema())
+    #     measureExpTable = qztable.Table(measureExpTable.getSchema())
+    return measureExpTable, measureExposureTable
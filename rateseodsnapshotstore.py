@@ -0,0 +1,169 @@
+'''
+Id:          "$Id: rateseodsnapshotstore.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Append-only per-day store of the combined intraday snapshots of the Rates EOD limits.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodsnapshotstore
+'''
+import os
+import pickle
+import shutil
+import threading
+from collections.abc import Mapping
+
+from qz.tools.gov.lib import logging
+
+from qz.remoterisk.cftc.utils.persistence import SNAPSHOTS, SNAPTIME
+
+USD_SUFFIX = '_USD'
+
+logger = logging.getLogger(__name__)
+
+
+def hourKey(runHour):
+    return int(runHour) if str(runHour).isdigit() else str(runHour)
+
+def snapLabel(snapTime):
+    '''
+    Label of the exposure columns of an earlier snap, e.g. 12PM or 1PM.
+    '''
+    return snapTime.strftime('%I%p').lstrip('0')
+
+def valueCols(snapshot):
+    return [col for col in snapshot.columnNames() if col.endswith(USD_SUFFIX)]
+
+def labelSnapshot(snapshot, label):
+    '''
+    :returns: snapshot with its current exposure columns labelled with the snap label
+    :rtype: qztable
+    '''
+    currentCols = valueCols(snapshot)
+    return snapshot.rename(currentCols, [' '.join([col, label]) for col in currentCols])
+
+def foldSnapshots(earlier, current):
+    '''
+    Combine the current snapshots with the combined view of the previous snap: the exposure columns of the
+    previous snap get its snap label, and the current exposures are joined on the other columns. The join only
+    keeps the rows present in both snaps, as the views of combineWithEarlierSnapshots do: no Exposure_Details
+    sheet has a blank exposure cell. A measure missing from this snap keeps its earlier columns, labelled, with
+    an empty current exposure column so its earlier exposures are not reported as this snap's.
+
+    :param dict earlier: {SNAPSHOTS: {measure: qztable}, SNAPTIME: datetime} combined view of the previous snap
+    :param dict current: {SNAPSHOTS: {measure: qztable}, SNAPTIME: datetime} snapshots of this snap
+    :returns: combined view of this snap
+    :rtype: dict
+    '''
+    label = snapLabel(earlier[SNAPTIME])
+    combined = {}
+    for measure, snapshot in current[SNAPSHOTS].items():
+        earlierSnapshot = earlier[SNAPSHOTS].get(measure)
+        if not earlierSnapshot:
+            combined[measure] = snapshot
+            continue
+        currentCols = valueCols(snapshot)
+        keyCols = [col for col in snapshot.columnNames() if col not in currentCols]
+        combined[measure] = labelSnapshot(earlierSnapshot, label).join(snapshot, keyCols, mergeKeyCols=True)
+    for measure, earlierSnapshot in earlier[SNAPSHOTS].items():
+        if measure in combined:
+            continue
+        missingSnapshot = labelSnapshot(earlierSnapshot, label)
+        for col in valueCols(earlierSnapshot):
+            missingSnapshot = missingSnapshot.extendConst(float('nan'), col, 'double')
+        combined[measure] = missingSnapshot
+    return {SNAPSHOTS: combined, SNAPTIME: current[SNAPTIME]}
+
+
+class SnapshotStore(object):
+    '''
+    Combined snapshot views of a level for one day, one file per run hour.
+    Every run reads the view of the latest earlier run hour and appends its own.
+    '''
+    
+    def __init__(self, root, runDate, level):
+        self.path = os.path.join(root, str(runDate), level)
+        
+    def hourPath(self, runHour):
+        return os.path.join(self.path, f'{runHour}.pkl')
+        
+    def latestBefore(self, runHour):
+        '''
+        :returns: combined view of the latest run hour before runHour, None if there is none
+        :rtype: dict
+        '''
+        if not os.path.isdir(self.path):
+            return None
+        hours = [name[:-len('.pkl')] for name in os.listdir(self.path) if name.endswith('.pkl')]
+        hours = [hour for hour in hours if hourKey(hour) < hourKey(runHour)]
+        if not hours:
+            return None
+        with open(self.hourPath(max(hours, key=hourKey)), 'rb') as f:
+            return pickle.load(f)
+        
+    def append(self, runHour, combinedSnapshots):
+        os.makedirs(self.path, exist_ok=True)
+        tmpPath = self.hourPath(runHour) + '.tmp'
+        with open(tmpPath, 'wb') as f:
+            pickle.dump(combinedSnapshots, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, self.hourPath(runHour))
+        
+    def combine(self, cfg, runHour, currentSnapshots, level):
+        '''
+        Drop-in for combineWithEarlierSnapshots that only reads the maintained view of the previous snap.
+        The first snap of the day in the store goes through combineWithEarlierSnapshots.
+        '''
+        earlier = self.latestBefore(runHour)
+        if earlier is None:
+            logger.info('No earlier snapshot in the store for %s, combining from sandra', level)
+            from qz.remoterisk.cftc.limits.rateseodsnapshots import combineWithEarlierSnapshots
+            combinedSnapshots = combineWithEarlierSnapshots(cfg, runHour, currentSnapshots, level)
+        else:
+            combinedSnapshots = foldSnapshots(earlier, currentSnapshots)
+        self.append(runHour, combinedSnapshots)
+        return combinedSnapshots
+
+
+class SpilledSnapshots(Mapping):
+    '''
+    {level: snapshots} handed to alertEmail in place of snapshotsDict. The snapshots of every VTD are written to disk
+    as the VTD finishes and a level is read back when it is looked up, so the snapshots of all the VTDs are not held
+    in memory until the email is built.
+    '''
+    
+    def __init__(self, root, runDate, runHour):
+        self.path = os.path.join(root, str(runDate), str(runHour))
+        self.levels = []
+        
+    def levelPath(self, level):
+        return os.path.join(self.path, level.replace('/', '_') + '.pkl')
+        
+    def write(self, level, snapshots):
+        '''
+        Write the snapshots of a level, the level is only listed once added in report order.
+        '''
+        os.makedirs(self.path, exist_ok=True)
+        # VTDs are written from concurrent threads
+        tmpPath = f'{self.levelPath(level)}.{threading.get_ident()}.tmp'
+        with open(tmpPath, 'wb') as f:
+            pickle.dump(snapshots, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, self.levelPath(level))
+        
+    def add(self, level):
+        if level not in self.levels:
+            self.levels.append(level)
+        
+    def __getitem__(self, level):
+        if level not in self.levels:
+            raise KeyError(level)
+        with open(self.levelPath(level), 'rb') as f:
+            return pickle.load(f)
+        
+    def __iter__(self):
+        return iter(self.levels)
+        
+    def __len__(self):
+        return len(self.levels)
+        
+    def remove(self):
+        '''
+        Delete the written snapshots once the email is sent.
+        '''
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,187 @@
+'''
+Id:          "$Id: rateseodstandins.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Local stand-in backends for the Rates EOD sources, serving recorded or synthetic exposures with a
+             configurable latency, failure rate and per measure emptiness, to test failures and run times without
+             the production sources.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodstandins
+'''
+import os
+import json
+import time
+import random
+import threading
+
+import yaml
+
+from qz.tools.gov.lib import logging
+
+from qz.remoterisk.cftc.limits.rateseoddatasources import SourceBackend, timedMeasureFetch
+from qz.remoterisk.cftc.limits.rateseodrecordings import SourceRecordings
+from qz.remoterisk.cftc.limits.rateseodsynthetic import SyntheticBook, BASE_ROWS
+from qz.remoterisk.cftc.limits.rateseodcolumns import MEASURE_COL
+
+STAND_IN_SOURCES = 'stand_in_sources'
+ALL_MEASURES = '*'
+
+logger = logging.getLogger(__name__)
+
+_backends = {}
+_backendsLock = threading.Lock()
+
+
+class StandInSourceError(RuntimeError):
+    '''
+    Failure injected by a stand-in source.
+    '''
+
+
+def replayLatencies(manifestPath, source):
+    '''
+    Measure fetch durations of a source recorded in a run manifest.
+
+    :returns: {(vtd, measure): [seconds]}, with all the durations of the source under None
+    :rtype: dict
+    '''
+    with open(manifestPath) as f:
+        stages = json.load(f).get('stages', [])
+    latencies = {None: []}
+    for entry in stages:
+        if entry.get('stage') != 'measure_fetch' or entry.get('source') != source:
+            continue
+        latencies.setdefault((entry.get('vtd'), entry.get('measure')), []).append(entry['seconds'])
+        latencies[None].append(entry['seconds'])
+    return latencies
+
+
+class LatencyModel(object):
+    '''
+    Latency of a measure fetch, the distribution is one of
+    fixed (seconds), uniform (min_seconds, max_seconds), lognormal (median_seconds, sigma)
+    or replay (manifest, a run manifest whose measure fetch durations of the source are replayed).
+    '''
+    
+    def __init__(self, source, spec, rand):
+        self.spec = spec or {}
+        self.rand = rand
+        self.distribution = self.spec.get('distribution', 'fixed')
+        self.latencies = None
+        if self.distribution == 'replay':
+            self.latencies = replayLatencies(self.spec['manifest'], self.spec.get('source', source))
+            
+    def sample(self, vtd, measure):
+        if self.distribution == 'fixed':
+            return self.spec.get('seconds', 0.0)
+        if self.distribution == 'uniform':
+            return self.rand.uniform(self.spec.get('min_seconds', 0.0), self.spec['max_seconds'])
+        if self.distribution == 'lognormal':
+            return self.rand.lognormvariate(0.0, self.spec.get('sigma', 0.5)) * self.spec['median_seconds']
+        if self.distribution == 'replay':
+            # replay the durations of the same measure of the same VTD when the manifest has them
+            latencies = self.latencies.get((vtd, measure)) or self.latencies[None]
+            return self.rand.choice(latencies) if latencies else 0.0
+        raise ValueError('Unknown latency distribution %s' % self.distribution)
+
+
+class StandInSource(object):
+    '''
+    Stand-in for one source, serves the recorded exposures of a measure when there are some and synthetic ones otherwise.
+    '''
+    
+    def __init__(self, key, spec, book, recordingsDir=None, recordingsDate=None, seed=0):
+        self.key = key
+        self.rand = random.Random('%s|%s' % (seed, key))
+        self.latency = LatencyModel(key, spec.get('latency', None), self.rand)
+        self.failureRate = spec.get('failure_rate', 0.0)
+        self.emptyMeasures = spec.get('empty_measures', {}) or {}
+        self.book = book
+        self.recordingsDir = recordingsDir
+        self.recordingsDate = recordingsDate
+        
+    def isEmpty(self, name, measure):
+        measures = self.emptyMeasures.get(name, [])
+        return measures == ALL_MEASURES or measure in measures
+    
+    def recorded(self, name, measure):
+        if not self.recordingsDir:
+            return None
+        return SourceRecordings(self.recordingsDir, self.recordingsDate, name, self.key).get(measure)
+        
+    def fetchMeasure(self, name, measure):
+        '''
+        :param str name: VTD name
+        :returns: snapshot table and exposure table with the Measure column, both None if there are no exposures
+        :rtype: tuple
+        '''
+        time.sleep(self.latency.sample(name, measure))
+        if self.rand.random() < self.failureRate:
+            raise StandInSourceError('Injected failure of %s for %s of %s' % (self.key, measure, name))
+        if self.isEmpty(name, measure):
+            return None, None
+        tables = self.recorded(name, measure)
+        if tables is not None:
+            return tables
+        measureExpTable = self.book.legacyTable(name, measure)
+        return measureExpTable, measureExpTable.extendConst(measure, MEASURE_COL, 'string')
+
+
+class StandInBackends(object):
+    '''
+    Stand-in sources of a stand_in_sources file, e.g.
+
+        seed: 0
+        rows: 250                       # synthetic rows per measure
+        recordings_dir: /path           # optional record_sources_dir of a run whose fetches were recorded
+        recordings_date: '20250815'     # COB date of the recorded run
+        sources:
+            cirt_rra:
+                latency: {distribution: lognormal, median_seconds: 2.0, sigma: 0.6}
+                failure_rate: 0.01
+                empty_measures:
+                    AMRS LINEAR RATES: '*'
+            legacy:
+                latency: {distribution: replay, manifest: /path/rates_eod_20250815_150100.json}
+
+    Sources not listed in the file are served without latency, failures or empty measures.
+    '''
+    
+    def __init__(self, spec):
+        self.spec = spec or {}
+        self.seed = self.spec.get('seed', 0)
+        self.book = SyntheticBook(0, 0, self.spec.get('rows', BASE_ROWS), self.seed)
+        self.sources = {}
+        self.lock = threading.Lock()
+        
+    def source(self, key):
+        with self.lock:
+            if key not in self.sources:
+                self.sources[key] = StandInSource(key, (self.spec.get('sources', {}) or {}).get(key, {}) or {}, self.book,
+                                                  self.spec.get('recordings_dir', None), self.spec.get('recordings_date', None), self.seed)
+            return self.sources[key]
+
+
+def standInBackends(cfg):
+    '''
+    :returns: stand-in backends of the stand_in_sources file of the config, None when the real sources are used
+    :rtype: StandInBackends
+    '''
+    path = cfg.get(STAND_IN_SOURCES, None)
+    if not path:
+        return None
+    mtime = os.path.getmtime(path)
+    with _backendsLock:
+        if path not in _backends or _backends[path][0] != mtime:
+            logger.info('Serving the sources from the stand-ins of %s', path)
+            with open(path) as f:
+                _backends[path] = (mtime, StandInBackends(yaml.safe_load(f)))
+        return _backends[path][1]
+
+
+class StandInBackend(SourceBackend):
+    '''
+    Backend of every source when stand_in_sources is set, the stand-ins are not cached.
+    '''
+    
+    def measureFetch(self):
+        source = standInBackends(self.cfg).source(self.key)
+        return timedMeasureFetch(self.key, self.name, lambda measure: source.fetchMeasure(self.name, measure))
@@ -0,0 +1,189 @@
+'''
+Id:          "$Id: rateseodsynthetic.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Deterministic synthetic exposures, limits and configs shaped like the Rates EOD sources, to run the
+             limits pipeline without the production sources.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodsynthetic
+'''
+import zlib
+import random
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.limits.rateseodlimitsindex import CALC_LEVEL_COL
+from qz.remoterisk.cftc.utils.persistence import BUS_AREA_COL, DESK_COL, LETIER1_COL, CURRENCY_COL, MEASURE_COL,\
+    EXPOSURES_COL, EXPOSURES_USD_COL
+
+# volume of an hourly run today: 8 VTDs with up to 3 measures of ~250 Exposure_Details rows each
+BASE_VTDS = 8
+BASE_MEASURES = 3
+BASE_ROWS = 250
+
+BUSINESS_AREA = 'GLOBAL RATES'
+MEASURES = ['IR Delta', 'IR Vega', 'Inflation Delta', 'IR01', 'Vega', 'IRDelta', 'IRVega', 'InflationDelta']
+LE_TIERS = ['BANA', 'MLI', 'BofASE', 'MLGI', 'BAMLJ']
+CURRENCIES = ['USD', 'EUR', 'GBP', 'JPY', 'AUD', 'CAD', 'CHF', 'NZD']
+CALC_LEVELS = ['VTD', 'LE']
+SOURCES = ['cirt_rra', 'legacy']
+MAPPING_CONFIG = 'synthetic_rates_eod_yaml_mapping'
+
+
+class SyntheticBook(object):
+    '''
+    Exposures of vtds VTDs with measures measures of rows rows each, with matching limits and configs.
+    The same arguments always give the same data.
+    '''
+    
+    def __init__(self, vtds=BASE_VTDS, measures=BASE_MEASURES, rows=BASE_ROWS, seed=0):
+        self.vtdNames = ['SYNTHETIC RATES %03d' % i for i in range(vtds)]
+        self.measureNames = [MEASURES[i] if i < len(MEASURES) else 'Measure %03d' % i for i in range(measures)]
+        self.rows = rows
+        self.seed = seed
+        self.rowsCache = {}
+        
+    def random(self, *keys):
+        return random.Random(zlib.crc32('|'.join(str(key) for key in (self.seed,) + keys).encode()))
+    
+    def source(self, vtd):
+        '''
+        Source of a VTD, VTDs alternate between RRA and legacy so both fetch paths are exercised.
+        '''
+        return SOURCES[self.vtdNames.index(vtd) % len(SOURCES)]
+    
+    def exposureRows(self, vtd, measure):
+        '''
+        :returns: Exposure_Details rows of the measure for the VTD, without the exposure column
+        :rtype: list
+        '''
+        key = (vtd, measure)
+        if key not in self.rowsCache:
+            rand = self.random(vtd, measure)
+            rows = []
+            for i in range(self.rows):
+                rows.append({'DivisionName': 'FICC',
+                             BUS_AREA_COL: BUSINESS_AREA,
+                             DESK_COL: vtd,
+                             LETIER1_COL: rand.choice(LE_TIERS),
+                             'BusinessUnit': '%s BU %02d' % (vtd, i % 20),
+                             'Book': '%s BOOK %05d' % (vtd, i),
+                             CURRENCY_COL: rand.choice(CURRENCIES),
+                             EXPOSURES_COL: rand.gauss(0, 1e5)})
+            self.rowsCache[key] = rows
+        return self.rowsCache[key]
+    
+    def exposureValue(self, row):
+        return row[EXPOSURES_COL] * 1.1
+    
+    def rraTable(self, vtd, measure):
+        '''
+        RRA result for a measure of a VTD, with the exposures in <Measure>_USD as fetch_exposures_eod returns them.
+
+        :rtype: qztable
+        '''
+        rows = []
+        for row in self.exposureRows(vtd, measure):
+            row = dict(row)
+            row['_'.join([measure, 'USD'])] = self.exposureValue(row)
+            rows.append(row)
+        return tableFromListOfDicts(rows)
+    
+    def legacyTable(self, vtd, measure):
+        '''
+        Legacy container of a measure of a VTD, with the exposures already in Exposures_USD.
+
+        :rtype: qztable
+        '''
+        rows = []
+        for row in self.exposureRows(vtd, measure):
+            row = dict(row)
+            row[EXPOSURES_USD_COL] = self.exposureValue(row)
+            rows.append(row)
+        return tableFromListOfDicts(rows)
+    
+    def limits(self):
+        '''
+        :returns: RATESLIMITS style limits, at VTD level for every VTD and at LE level for the business area
+        :rtype: list
+        '''
+        limits = []
+        for measure in self.measureNames:
+            for vtd in self.vtdNames:
+                for limitName in self.limitNames(measure):
+                    limits.append(self.limit('VTD', vtd, limitName, '', measure))
+            for leTier in LE_TIERS:
+                for limitName in self.limitNames(measure):
+                    limits.append(self.limit('LE', BUSINESS_AREA, limitName, leTier, measure))
+        return limits
+    
+    def limitNames(self, measure):
+        if measure in ['IR Vega', 'IRVega', 'Vega']:
+            return ['%s Limit' % measure, '%s M10%% Limit' % measure, '%s P10%% Limit' % measure]
+        return ['%s Limit' % measure]
+    
+    def limit(self, calcLevel, level, limitName, leTier, measure):
+        return {CALC_LEVEL_COL: calcLevel,
+                'Level': level,
+                'Limit Name': limitName,
+                LETIER1_COL: leTier,
+                MEASURE_COL: measure,
+                'Limit Value': self.random(calcLevel, level, limitName, leTier).uniform(1e6, 1e8),
+                'Shift_Name': -0.1 if 'M10%' in limitName else 0.1}
+    
+    def joinedRows(self, count):
+        '''
+        Exposures joined with limits as they reach shiftCalculation, cycling over the limits of the book.
+        Every 50th row has a zero limit.
+
+        :param int count: number of rows
+        :rtype: list
+        '''
+        limits = self.limits()
+        rand = self.random('joined', count)
+        rows = []
+        for i in range(count):
+            row = dict(limits[i % len(limits)])
+            row[EXPOSURES_USD_COL] = rand.gauss(0, 1e6)
+            if i % 50 == 49:
+                row['Limit Value'] = 0.0
+            rows.append(row)
+        return rows
+    
+    def vtdConfig(self, vtd, **options):
+        '''
+        :param options: VTD level settings, e.g. async_sources
+        :returns: VTD config with a single source
+        :rtype: dict
+        '''
+        cfg = {'division': 'FICC',
+               'business_area': BUSINESS_AREA,
+               'trading_desk': vtd,
+               'rra_query_params': {'VolckerBusinessArea': BUSINESS_AREA, 'VolckerTradingDesk': vtd},
+               'sources': {self.source(vtd): [{'measure_names': list(self.measureNames)},
+                                              {'calc_level': list(CALC_LEVELS)}]}}
+        cfg.update(options)
+        return cfg
+    
+    def mappingConfig(self, **options):
+        '''
+        :param options: run level settings, e.g. vtd_workers
+        :returns: yaml_mapping config of all the VTDs
+        :rtype: dict
+        '''
+        cfg = {'yaml_mapping': dict((vtd, vtd.lower().replace(' ', '_')) for vtd in self.vtdNames),
+               'mail': 'synthetic@localhost',
+               'recipients_email': [],
+               'exposure_db': 'synthetic',
+               'exposure_path': '/synthetic/exposures'}
+        cfg.update(options)
+        return cfg
+    
+    def loadConfig(self, name, **options):
+        '''
+        Stand-in for rateseodconfig.loadConfig, VTD configs are looked up by their yaml_mapping value.
+        '''
+        for vtd in self.vtdNames:
+            if name.endswith(vtd.lower().replace(' ', '_')):
+                return self.vtdConfig(vtd, **options)
+        return self.mappingConfig(**options)
+    
+    def vtdOf(self, cfg):
+        return cfg['trading_desk']
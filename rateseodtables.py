@@ -0,0 +1,48 @@
+'''
+Id:          "$Id: rateseodtables.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Accumulation of qztables in the Rates EOD limits pipeline.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodtables
+'''
+import qztable
+
+
+class ExpTableCollector(object):
+    '''
+    Buffers tables and concatenates them once when the result is requested,
+    instead of copying everything collected so far on every append.
+    '''
+    
+    def __init__(self, alignColumns=False):
+        '''
+        :param bool alignColumns: project every table on the columns of the first non empty one and
+                                  drop empty tables, as done when combining snapshots of different sources
+        '''
+        self.alignColumns = alignColumns
+        self.tables = []
+        self.result = None
+        
+    def append(self, table):
+        if table is None:
+            return
+        self.tables.append(table)
+        self.result = None
+        
+    def __bool__(self):
+        return bool(self.tables)
+        
+    def table(self):
+        '''
+        :returns: concatenation of the collected tables, None if nothing was collected
+        :rtype: qztable
+        '''
+        if not self.tables:
+            return None
+        if self.result is None:
+            tables = self.tables
+            if self.alignColumns:
+                tables = [table for table in tables if table] or tables[-1:]
+                cols = tables[0].columnNames()
+                tables = [table if table.columnNames() == cols else table.project(cols) for table in tables]
+            self.result = tables[0] if len(tables) == 1 else qztable.vConcat(tables)
+        return self.result
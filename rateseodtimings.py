@@ -0,0 +1,143 @@
+'''
+Id:          "$Id: rateseodtimings.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Per-stage timings of a Rates EOD limits run, written to a JSON run manifest and summarized in the run log.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodtimings
+'''
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+from qz.tools.gov.lib import logging
+
+logger = logging.getLogger(__name__)
+
+_manifest = None
+
+
+class RunManifest(object):
+    '''
+    Durations and row counts of the stages of a run, with the VTD, source and measure they belong to.
+    Stages can be recorded from any thread.
+    '''
+    
+    def __init__(self, config):
+        self.config = config
+        self.started = datetime.now()
+        self.startTime = time.perf_counter()
+        self.stages = []
+        self.lock = threading.Lock()
+        
+    def record(self, stage, seconds, rows=None, **context):
+        entry = {'stage': stage, 'seconds': round(seconds, 6)}
+        if rows is not None:
+            entry['rows'] = rows
+        entry.update(context)
+        with self.lock:
+            self.stages.append(entry)
+            
+    def totals(self):
+        '''
+        :returns: {stage: {'calls', 'seconds', 'max_seconds', 'rows'}} in order of first occurrence
+        :rtype: dict
+        '''
+        totals = {}
+        with self.lock:
+            stages = list(self.stages)
+        for entry in stages:
+            total = totals.setdefault(entry['stage'], {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0})
+            total['calls'] += 1
+            total['seconds'] += entry['seconds']
+            total['max_seconds'] = max(total['max_seconds'], entry['seconds'])
+            total['rows'] += entry.get('rows', 0)
+        return totals
+    
+    def asDict(self):
+        with self.lock:
+            stages = list(self.stages)
+        return {'config': self.config,
+                'started': self.started.isoformat(),
+                'wall_seconds': round(time.perf_counter() - self.startTime, 6),
+                'totals': self.totals(),
+                'stages': stages}
+        
+    def summary(self):
+        '''
+        :returns: one line per stage, for the run log
+        :rtype: list
+        '''
+        lines = ['Run %s took %.1fs' % (self.config, time.perf_counter() - self.startTime)]
+        for stage, total in self.totals().items():
+            lines.append('%-24s %5d calls %9.2fs total %8.2fs max %10d rows' % (
+                stage, total['calls'], total['seconds'], total['max_seconds'], total['rows']))
+        return lines
+    
+    def write(self, directory):
+        '''
+        :returns: path of the JSON manifest
+        :rtype: str
+        '''
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'rates_eod_%s.json' % self.started.strftime('%Y%m%d_%H%M%S'))
+        with open(path, 'w') as f:
+            json.dump(self.asDict(), f, indent=2, default=str)
+        return path
+
+
+def startManifest(config):
+    '''
+    Start recording the stages of a run, replacing the manifest of any previous run in the process.
+    '''
+    global _manifest
+    _manifest = RunManifest(config)
+    return _manifest
+
+def currentManifest():
+    return _manifest
+
+def finishManifest(manifestDir=None):
+    '''
+    Log the stage summary of the run, and write its JSON manifest to manifestDir when set.
+    '''
+    global _manifest
+    manifest, _manifest = _manifest, None
+    if manifest is None:
+        return None
+    for line in manifest.summary():
+        logger.info(line)
+    if manifestDir:
+        path = manifest.write(manifestDir)
+        logger.info('Run manifest written to %s', path)
+    return manifest
+
+def rowCount(table):
+    return None if table is None else len(table)
+
+@contextmanager
+def timed(stage, **context):
+    '''
+    Time the block as stage of the current run, set 'rows' on the yielded dict to record a row count.
+    Nothing is recorded when no run manifest was started.
+    '''
+    timing = {}
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        manifest = _manifest
+        if manifest is not None:
+            manifest.record(stage, time.perf_counter() - start, timing.get('rows', None), **context)
+
+def timedCall(stage, fn, **context):
+    '''
+    Wrap fn so every call is timed as stage, e.g. for calls made from another thread.
+    '''
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with timed(stage, **context):
+            return fn(*args, **kwargs)
+    return wrapper
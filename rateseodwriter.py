@@ -0,0 +1,58 @@
+'''
+Id:          "$Id: rateseodwriter.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Write-behind queue for the Rates EOD limits sandra writes.
+Test: qz.remoterisk.tests.unittests.cftc.limits.rateseodwriter
+'''
+import queue
+import threading
+
+from qz.tools.gov.lib import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue(object):
+    '''
+    Runs writes on a background thread, in submission order, so they overlap with the work of the next VTD.
+    submit blocks once maxsize writes are pending, and failed writes are kept per key until flush.
+    '''
+    
+    def __init__(self, maxsize=2):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.failures = {}
+        self.thread = threading.Thread(target=self.worker, name='rateseod-write-behind', daemon=True)
+        self.thread.start()
+        
+    def submit(self, key, write, *args):
+        '''
+        :param str key: key the failure of the write is reported under, e.g. the VTD level
+        :param callable write: write function
+        '''
+        self.queue.put((key, write, args))
+        
+    def worker(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                key, write, args = item
+                try:
+                    write(*args)
+                except Exception as e:
+                    logger.exception('Write failed for %s', key)
+                    self.failures[key] = e
+            finally:
+                self.queue.task_done()
+                
+    def flush(self):
+        '''
+        Wait for all the pending writes and stop the queue.
+
+        :returns: {key: exception} of the failed writes
+        :rtype: dict
+        '''
+        self.queue.put(None)
+        self.thread.join()
+        return self.failures
@@ -0,0 +1,29 @@
+'''
+Id:          "$Id: rateseodbenchmark.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the stand-ins of the Rates EOD benchmark.
+'''
+import sys
+import types
+import unittest
+
+from qz.remoterisk.cftc.limits.rateseodbenchmark import moduleStandIn
+
+
+class ModuleStandInTest(unittest.TestCase):
+
+    def testModulesImportedDuringTheRunStayImported(self):
+        standIn = types.ModuleType('sandra')
+        original = sys.modules.get('sandra')
+        with moduleStandIn('sandra', standIn):
+            self.assertIs(sys.modules['sandra'], standIn)
+            sys.modules['rateseod_imported_by_run'] = types.ModuleType('rateseod_imported_by_run')
+        try:
+            self.assertIs(sys.modules.get('sandra'), original)
+            self.assertIn('rateseod_imported_by_run', sys.modules)
+        finally:
+            sys.modules.pop('rateseod_imported_by_run', None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+'''
+Id:          "$Id: rateseodcache.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the local on-disk cache of the Rates EOD source fetch results.
+'''
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from qz.remoterisk.cftc.limits.rateseodcache import ExposureCache, cacheKey, cachedMeasureFetch
+
+JOB_TIMESTAMP = datetime.datetime(2025, 8, 15, 15, 1)
+
+
+class ExposureCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def age(self, cache, key, accessed=0, modified=0):
+        '''
+        Move the access and write times of an entry the given seconds into the past.
+        '''
+        path = cache.path(key)
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime - accessed, stat.st_mtime - modified))
+
+    def testGetReturnsPutValue(self):
+        cache = ExposureCache(self.root, 1024 * 1024, 3600)
+        cache.put(('legacy', 'GLOBAL RATES', 'IR01'), ['snapshot', 'exposures'])
+        self.assertEqual(cache.get(('legacy', 'GLOBAL RATES', 'IR01')), ['snapshot', 'exposures'])
+        self.assertIsNone(cache.get(('legacy', 'GLOBAL RATES', 'Vega')))
+
+    def testExpiredEntryIsDropped(self):
+        cache = ExposureCache(self.root, 1024 * 1024, 3600)
+        cache.put('IR01', 'exposures')
+        self.age(cache, 'IR01', modified=3601)
+        self.assertIsNone(cache.get('IR01'))
+        self.assertFalse(os.path.exists(cache.path('IR01')))
+
+    def testHitDoesNotExtendTtl(self):
+        cache = ExposureCache(self.root, 1024 * 1024, 3600)
+        cache.put('IR01', 'exposures')
+        self.age(cache, 'IR01', modified=3000)
+        self.assertEqual(cache.get('IR01'), 'exposures')
+        self.age(cache, 'IR01', modified=601)
+        self.assertIsNone(cache.get('IR01'))
+
+    def testLeastRecentlyUsedEntryIsEvicted(self):
+        cache = ExposureCache(self.root, 1024 * 1024, 3600)
+        cache.put('IR01', 'x' * 1000)
+        entrySize = os.path.getsize(cache.path('IR01'))
+        cache.maxBytes = 2 * entrySize
+        cache.put('Vega', 'y' * 1000)
+        self.age(cache, 'IR01', accessed=200)
+        self.age(cache, 'Vega', accessed=100)
+        # the hit makes IR01 the most recently used entry
+        self.assertEqual(cache.get('IR01'), 'x' * 1000)
+        cache.put('IR Vega', 'z' * 1000)
+        self.assertTrue(os.path.exists(cache.path('IR01')))
+        self.assertFalse(os.path.exists(cache.path('Vega')))
+        self.assertTrue(os.path.exists(cache.path('IR Vega')))
+
+    def testExpiredEntriesAreEvictedOnPut(self):
+        cache = ExposureCache(self.root, 1024 * 1024, 3600)
+        cache.put('IR01', 'exposures')
+        self.age(cache, 'IR01', modified=3601)
+        cache.put('Vega', 'exposures')
+        self.assertFalse(os.path.exists(cache.path('IR01')))
+
+
+class CachedMeasureFetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = ExposureCache(self.root, 1024 * 1024, 3600)
+        self.fetched = []
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fetch(self, measure):
+        self.fetched.append(measure)
+        if measure == 'Vega':
+            return ['snapshot'], []
+        return ['snapshot'], ['exposures']
+
+    def testMeasuresWithExposuresAreServedFromCache(self):
+        fetch = cachedMeasureFetch(self.cache, 'legacy', 'GLOBAL RATES', JOB_TIMESTAMP, self.fetch)
+        self.assertEqual(fetch('IR01'), (['snapshot'], ['exposures']))
+        self.assertEqual(fetch('IR01'), (['snapshot'], ['exposures']))
+        self.assertEqual(self.fetched, ['IR01'])
+        self.assertEqual(self.cache.get(cacheKey('legacy', 'GLOBAL RATES', 'IR01', JOB_TIMESTAMP)),
+                         (['snapshot'], ['exposures']))
+
+    def testMeasuresWithoutExposuresAreNotCached(self):
+        fetch = cachedMeasureFetch(self.cache, 'legacy', 'GLOBAL RATES', JOB_TIMESTAMP, self.fetch)
+        fetch('Vega')
+        fetch('Vega')
+        self.assertEqual(self.fetched, ['Vega', 'Vega'])
+
+    def testNoCacheReturnsFetch(self):
+        fetch = self.fetch
+        self.assertIs(cachedMeasureFetch(None, 'legacy', 'GLOBAL RATES', JOB_TIMESTAMP, fetch), fetch)
+
+
+if __name__ == '__main__':
+    unittest.main()
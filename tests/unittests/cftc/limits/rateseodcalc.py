@@ -0,0 +1,65 @@
+'''
+Id:          "$Id: rateseodcalc.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the utilization and shock arithmetic of the Rates EOD limits.
+'''
+import math
+import unittest
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.limits.rateseodcalc import DEFAULT_SHOCK_GRID, applyShockGrid, extendUtilization, rowUtilization
+
+RESULTING_COLS = ['Level', 'Limit Name', 'LETier1', 'Measure', 'Limit Value', 'Exposures_USD']
+
+
+def limitsTable(rows):
+    '''
+    Exposures joined with limits, rows of (Limit Name, Measure, Exposures_USD, Shift_Name).
+    '''
+    return tableFromListOfDicts([{'Level': 'GLOBAL RATES', 'Limit Name': limitName, 'LETier1': 'BANA', 'Measure': measure,
+                                  'Limit Value': 100.0, 'Shift_Name': shift, 'Exposures_USD': exposure}
+                                 for limitName, measure, exposure, shift in rows])
+
+def exposures(table):
+    return dict((row[1], row[-1]) for row in table.uniqueRows())
+
+
+class UtilizationTest(unittest.TestCase):
+
+    def testRowUtilization(self):
+        self.assertEqual(rowUtilization(-50.0, 200.0), 25.0)
+        self.assertTrue(math.isnan(rowUtilization(50.0, 0.0)))
+        self.assertTrue(math.isnan(rowUtilization(50.0, None)))
+
+    def testExtendUtilizationKeepsRowsWithoutLimit(self):
+        table = tableFromListOfDicts([{'Limit Value': 200.0, 'Exposures_USD': 50.0}, {'Limit Value': 0.0, 'Exposures_USD': 50.0}])
+        rows = extendUtilization(table).uniqueRows()
+        self.assertEqual(rows[0], (200.0, 50.0, 25.0))
+        self.assertTrue(math.isnan(rows[1][2]))
+
+
+class ApplyShockGridTest(unittest.TestCase):
+
+    def testDefaultGridShiftsM10AndP10LimitsOfEveryMeasure(self):
+        table = limitsTable([('IR Vega M10% limit', 'IR Vega', 10.0, 0.9), ('IR01 P10% limit', 'IR01', 10.0, 1.1),
+                             ('IR Vega limit', 'IR Vega', 10.0, 0.9)])
+        result = applyShockGrid(table, DEFAULT_SHOCK_GRID, RESULTING_COLS)
+        self.assertEqual(result.columnNames(), RESULTING_COLS)
+        self.assertEqual(exposures(result), {'IR Vega M10% limit': 9.0, 'IR01 P10% limit': 11.0, 'IR Vega limit': 10.0})
+
+    def testFirstMatchingEntryWins(self):
+        grid = [{'measure': 'IR Vega', 'limit_names': ['M25%'], 'shift': 0.75},
+                {'limit_names': ['25%'], 'shift': 2.0},
+                {'measure': 'IR01', 'shift': 3.0}]
+        table = limitsTable([('IR Vega M25% limit', 'IR Vega', 10.0, None), ('IR01 P25% limit', 'IR01', 10.0, None),
+                             ('IR01 limit', 'IR01', 10.0, None), (None, 'IR Vega', 10.0, None)])
+        self.assertEqual(exposures(applyShockGrid(table, grid, RESULTING_COLS)),
+                         {'IR Vega M25% limit': 7.5, 'IR01 P25% limit': 20.0, 'IR01 limit': 30.0, None: 10.0})
+
+    def testEntryWithoutMeasureOrLimitNames(self):
+        with self.assertRaises(ValueError):
+            applyShockGrid(limitsTable([]), [{'shift': 2.0}], RESULTING_COLS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+'''
+Id:          "$Id: rateseodcolumns.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests that the Rates EOD column names match the persistence module.
+'''
+import unittest
+
+from qz.remoterisk.cftc.limits import rateseodcolumns
+from qz.remoterisk.cftc.utils import persistence
+
+COLS = ['BUS_AREA_COL', 'DESK_COL', 'LETIER1_COL', 'CURRENCY_COL', 'MEASURE_COL', 'EXPOSURES_USD_COL']
+
+
+class ColumnsTest(unittest.TestCase):
+
+    def testColumnsMatchPersistence(self):
+        for col in COLS:
+            self.assertEqual(getattr(rateseodcolumns, col), getattr(persistence, col), col)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+'''
+Id:          "$Id: rateseodconfig.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the config resolution and the config bundle of the Rates EOD limits.
+'''
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from qz.remoterisk.cftc.limits import rateseodconfig
+from qz.remoterisk.cftc.limits.rateseodconfig import loadConfig, loadConfigBundle
+
+SIGNATURE = (('/configs/eod_default.yaml', 1.0),)
+
+
+class ConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.bundlePath = os.path.join(self.root, 'rates_eod_configs.bundle')
+        patches = [mock.patch.dict(rateseodconfig._configs, clear=True),
+                   mock.patch.object(rateseodconfig, 'CFTCConfStatic', side_effect=lambda name: {'name': name}),
+                   mock.patch.object(rateseodconfig, 'configSignature', return_value=SIGNATURE)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def writeBundle(self, signature, configs):
+        with open(self.bundlePath, 'wb') as f:
+            pickle.dump({'signature': signature, 'configs': configs}, f)
+
+    def testConfigIsResolvedOnceWithoutCheckingTheFiles(self):
+        self.assertIs(loadConfig('uat_common'), loadConfig('uat_common'))
+        self.assertEqual(rateseodconfig.CFTCConfStatic.call_count, 1)
+        rateseodconfig.configSignature.assert_not_called()
+
+    def testBundleSeedsTheConfigs(self):
+        self.writeBundle(SIGNATURE, {'uat_common': {'name': 'bundled'}})
+        self.assertEqual(loadConfigBundle(self.bundlePath), 1)
+        self.assertEqual(loadConfig('uat_common'), {'name': 'bundled'})
+        self.assertEqual(loadConfig('uat_global_rates'), {'name': 'uat_global_rates'})
+
+    def testStaleBundleIsAMiss(self):
+        self.writeBundle((('/configs/eod_default.yaml', 2.0),), {'uat_common': {'name': 'bundled'}})
+        self.assertEqual(loadConfigBundle(self.bundlePath), 0)
+        self.assertEqual(loadConfig('uat_common'), {'name': 'uat_common'})
+
+    def testMissingOrUnreadableBundleIsAMiss(self):
+        self.assertEqual(loadConfigBundle(self.bundlePath), 0)
+        with open(self.bundlePath, 'wb') as f:
+            f.write(b'not a bundle')
+        self.assertEqual(loadConfigBundle(self.bundlePath), 0)
+        self.assertEqual(loadConfig('uat_common'), {'name': 'uat_common'})
+
+
+if __name__ == '__main__':
+    unittest.main()
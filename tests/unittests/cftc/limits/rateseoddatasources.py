@@ -0,0 +1,83 @@
+'''
+Id:          "$Id: rateseoddatasources.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the deadlines, dispatch and source settings of the Rates EOD limits data sources.
+'''
+import time
+import threading
+import unittest
+
+from qz.remoterisk.cftc.limits.rateseoddatasources import callWithDeadline, dataSourceFactory, normalizeSources
+
+SCREEN_SOURCES = {'cirt_unified_screen': [{'measure_names': ['IR01', 'Vega']}, {'calc_level': ['VTD']}]}
+
+
+class CallWithDeadlineTest(unittest.TestCase):
+
+    def testFetchReturningInTime(self):
+        self.assertEqual(callWithDeadline(lambda: 'exposures', 5), (True, 'exposures'))
+
+    def testNoDeadlineCallsFetchInline(self):
+        self.assertEqual(callWithDeadline(threading.current_thread, None), (True, threading.current_thread()))
+
+    def testHungFetchIsAbandonedAtTheDeadline(self):
+        release = threading.Event()
+        start = time.time()
+        self.assertEqual(callWithDeadline(lambda: release.wait(10), 0.2), (False, None))
+        self.assertLess(time.time() - start, 5)
+        release.set()
+
+    def testHungFetchRunsOnDaemonThread(self):
+        release = threading.Event()
+        daemon = []
+
+        def fetch():
+            daemon.append(threading.current_thread().daemon)
+            release.wait(10)
+
+        callWithDeadline(fetch, 0.2)
+        release.set()
+        self.assertEqual(daemon, [True])
+
+    def testFetchNotStartedWhenTimeoutIsUsedUp(self):
+        started = []
+        self.assertEqual(callWithDeadline(lambda: started.append(True), 0), (False, None))
+        self.assertEqual(callWithDeadline(lambda: started.append(True), -1), (False, None))
+        self.assertEqual(started, [])
+
+    def testFetchErrorIsRaised(self):
+        def fetch():
+            raise ValueError('bad query')
+
+        with self.assertRaises(ValueError):
+            callWithDeadline(fetch, 5)
+
+
+class DataSourceFactoryTest(unittest.TestCase):
+
+    def testSourceWithoutBackendReportsItsMeasuresMissing(self):
+        snapshots, expTable, fieldsDict = dataSourceFactory({}, 'cirt_unified_screen', SCREEN_SOURCES, None, 'AMRS LINEAR RATES')
+        self.assertEqual(snapshots, {})
+        self.assertIsNone(expTable)
+        self.assertEqual(fieldsDict['measuresMissingExposures'],
+                         {'IR01': ['cirt_unified_screen'], 'Vega': ['cirt_unified_screen']})
+        self.assertEqual(fieldsDict['calc_level'], ['VTD'])
+
+
+class NormalizeSourcesTest(unittest.TestCase):
+
+    def testMappingIsKept(self):
+        sources = {'legacy': [{'measure_names': ['IR01']}]}
+        self.assertEqual(normalizeSources(sources), sources)
+
+    def testListFormIsMerged(self):
+        sources = [{'cirt_rra': [{'measure_names': ['IR01']}]},
+                   {'legacy': [{'measure_names': ['Vega']}]},
+                   {'cirt_rra': [{'calc_level': ['VTD+Currency']}]}]
+        self.assertEqual(normalizeSources(sources),
+                         {'cirt_rra': [{'measure_names': ['IR01']}, {'calc_level': ['VTD+Currency']}],
+                          'legacy': [{'measure_names': ['Vega']}]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+'''
+Id:          "$Id: rateseodlimits.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the Rates EOD limits run, with the sources, sandra and the email left out.
+'''
+import unittest
+from unittest import mock
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.limits import rateseodlimits
+from qz.remoterisk.cftc.limits.rateseodlimits import RatesEODLimits, VTDRun
+
+SOURCES = {'cirt_rra': [{'measure_names': ['IR01', 'Vega']}, {'calc_level': ['VTD']}],
+           'legacy': [{'measure_names': ['Sov Spread Delta']}, {'calc_level': ['VTD']}]}
+
+
+def limitsRun(yamlConfig=None):
+    '''
+    RatesEODLimits without the bob environment and timestamps of a real run.
+    '''
+    obj = RatesEODLimits.__new__(RatesEODLimits)
+    obj.config = 'test_rates_eod_yaml_mapping'
+    obj.yamlConfig = yamlConfig or {}
+    obj.useCache = True
+    obj.jobTimestamp = None
+    obj.runDeadline = None
+    obj.report = None
+    obj.finalExpTable = None
+    obj.snapshotsDict = {}
+    obj.spilledSnapshots = None
+    obj.reportLevels = []
+    return obj
+
+def vtdRun(name, rows):
+    '''
+    VTDRun as returned by processVTD, with its exposures aggregated at limit code level.
+    '''
+    vtd = VTDRun(name, {})
+    vtd.vtdExpTable = tableFromListOfDicts([dict(zip(['Level', 'Limit Name', 'Limit Value', 'Exposures_USD', 'Utilization'], row))
+                                            for row in rows])
+    vtd.levels = list(dict.fromkeys(row[0] for row in rows))
+    vtd.level = vtd.levels[0]
+    vtd.snaps = name + ' snaps'
+    return vtd
+
+def tableRows(table):
+    return dict((row[:2], row[3:]) for row in table.uniqueRows())
+
+
+class MergeVTDRunsTest(unittest.TestCase):
+
+    def testLevelsSharedByVTDsAreAggregatedOnce(self):
+        run = limitsRun()
+        run.report = mock.Mock()
+        run.mergeVTDRuns([vtdRun('GLOBAL RATES', [('GLOBAL RATES', 'IR01 limit', 100.0, 10.0, 10.0),
+                                                  ('AMRS LINEAR RATES', 'IR01 limit', 200.0, 20.0, 10.0)]),
+                          vtdRun('AMRS LINEAR RATES', [('AMRS LINEAR RATES', 'IR01 limit', 200.0, 30.0, 15.0)])])
+        self.assertEqual(tableRows(run.finalExpTable), {('GLOBAL RATES', 'IR01 limit'): (10.0, 10.0),
+                                                        ('AMRS LINEAR RATES', 'IR01 limit'): (50.0, 25.0)})
+        self.assertEqual(run.reportLevels, ['GLOBAL RATES', 'AMRS LINEAR RATES'])
+        self.assertEqual(run.snapshotsDict, {'GLOBAL RATES': 'GLOBAL RATES snaps', 'AMRS LINEAR RATES': 'AMRS LINEAR RATES snaps'})
+        (level, section), = [call[0] for call in run.report.addSection.call_args_list]
+        self.assertEqual(level, 'AMRS LINEAR RATES')
+        self.assertEqual(tableRows(section), {('AMRS LINEAR RATES', 'IR01 limit'): (50.0, 25.0)})
+
+    def testSingleVTDIsNotAggregatedAgain(self):
+        run = limitsRun()
+        vtd = vtdRun('GLOBAL RATES', [('GLOBAL RATES', 'IR01 limit', 100.0, 10.0, 10.0)])
+        run.mergeVTDRuns([vtd, VTDRun('AMRS LINEAR RATES', {})])
+        self.assertIs(run.finalExpTable, vtd.vtdExpTable)
+        self.assertEqual(run.snapshotsDict, {'GLOBAL RATES': 'GLOBAL RATES snaps'})
+
+    def testSpilledSnapshotsAreListedInYamlMappingOrder(self):
+        run = limitsRun()
+        run.spilledSnapshots = mock.Mock()
+        vtds = [vtdRun('GLOBAL RATES', [('GLOBAL RATES', 'IR01 limit', 100.0, 10.0, 10.0)]),
+                vtdRun('AMRS LINEAR RATES', [('AMRS LINEAR RATES', 'IR01 limit', 200.0, 20.0, 10.0)])]
+        for vtd in vtds:
+            run.spillSnapshots(vtd)
+        run.mergeVTDRuns(vtds)
+        self.assertEqual(run.spilledSnapshots.write.call_args_list, [mock.call('GLOBAL RATES', 'GLOBAL RATES snaps'),
+                                                                     mock.call('AMRS LINEAR RATES', 'AMRS LINEAR RATES snaps')])
+        self.assertEqual(run.spilledSnapshots.add.call_args_list, [mock.call('GLOBAL RATES'), mock.call('AMRS LINEAR RATES')])
+        self.assertEqual(run.snapshotsDict, {})
+
+
+class DetermineExposureTest(unittest.TestCase):
+
+    def testVTDsOnWorkersAreMergedInYamlMappingOrder(self):
+        yamlConfig = {'mail': 'sender', 'recipients_email': [], 'exposure_db': 'db', 'vtd_workers': 2,
+                      'yaml_mapping': {'GLOBAL RATES': 'global_rates', 'AMRS LINEAR RATES': 'amrs_linear_rates'}}
+        vtdRuns = {'GLOBAL RATES': vtdRun('GLOBAL RATES', [('GLOBAL RATES', 'IR01 limit', 100.0, 10.0, 10.0)]),
+                   'AMRS LINEAR RATES': vtdRun('AMRS LINEAR RATES', [('AMRS LINEAR RATES', 'IR01 limit', 200.0, 20.0, 10.0)])}
+        run = limitsRun()
+        run.writer = None
+        run.processVTD = vtdRuns.get
+        with mock.patch.object(rateseodlimits, 'loadConfig', return_value=yamlConfig):
+            run.determineExposure()
+        self.assertEqual([row[0] for row in run.finalExpTable.uniqueRows()], ['GLOBAL RATES', 'AMRS LINEAR RATES'])
+        self.assertEqual(run.reportLevels, ['GLOBAL RATES', 'AMRS LINEAR RATES'])
+
+
+class GetExpAtCalcLevelsTest(unittest.TestCase):
+
+    def testLevelsRolledUpFromGroupingSetsMatchDirectGrouping(self):
+        expTable = tableFromListOfDicts([
+            {'BusinessArea': 'RATES', 'TradingDesk': 'GLOBAL RATES', 'LETier1': 'BANA', 'Currency': 'USD', 'Measure': 'IR01', 'Exposures_USD': 1.0},
+            {'BusinessArea': 'RATES', 'TradingDesk': 'GLOBAL RATES', 'LETier1': 'BANA', 'Currency': 'EUR', 'Measure': 'IR01', 'Exposures_USD': 2.0},
+            {'BusinessArea': 'RATES', 'TradingDesk': 'GLOBAL RATES', 'LETier1': 'MLI', 'Currency': 'USD', 'Measure': 'IR01', 'Exposures_USD': 4.0},
+            {'BusinessArea': 'RATES', 'TradingDesk': 'GLOBAL RATES', 'LETier1': 'MLI', 'Currency': 'USD', 'Measure': 'Vega', 'Exposures_USD': 8.0}])
+        run = limitsRun()
+        calcLevels = ['LE', 'Currency', 'VTD', 'VTD+Currency']
+        levels = run.getExpAtCalcLevels(expTable, calcLevels)
+        self.assertEqual(list(levels), calcLevels)
+        for calcLevel in calcLevels:
+            table, colList = levels[calcLevel]
+            direct = run.getExpAtCalcLevel(expTable, run.addCalcLevelCols(calcLevel))
+            self.assertEqual(colList[-1], 'Level')
+            self.assertEqual(sorted(table.project(colList + ['Exposures_USD']).uniqueRows()),
+                             sorted(direct.project(colList + ['Exposures_USD']).uniqueRows()))
+        self.assertEqual(sorted(levels['VTD'][0].project(['Measure', 'Exposures_USD']).uniqueRows()), [('IR01', 7.0), ('Vega', 8.0)])
+
+
+class FetchSourceTest(unittest.TestCase):
+
+    def testFailedSourceOnlyReportsItsOwnMeasuresMissing(self):
+        vtd = VTDRun('GLOBAL RATES', {})
+
+        def dataSourceFactory(cfg, key, dataSources, jobTimeStamp, name, useCache=True):
+            if key == 'cirt_rra':
+                raise RuntimeError('RRA is down')
+            return {}, 'exposures', {'source': key, 'measure_names': ['Sov Spread Delta']}
+
+        with mock.patch.object(rateseodlimits, 'dataSourceFactory', dataSourceFactory):
+            results = dict(limitsRun().fetchSources(vtd, SOURCES))
+        self.assertEqual(results['cirt_rra'][:2], ({}, None))
+        self.assertEqual(results['legacy'][1], 'exposures')
+        self.assertEqual(vtd.measuresMissingExposures, {'IR01': ['cirt_rra'], 'Vega': ['cirt_rra']})
+        self.assertEqual(vtd.measureSources, {'Sov Spread Delta': ['legacy']})
+
+
+if __name__ == '__main__':
+    unittest.main()
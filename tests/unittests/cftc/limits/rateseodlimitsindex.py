@@ -0,0 +1,81 @@
+'''
+Id:          "$Id: rateseodlimitsindex.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the hashed limits index of the Rates EOD limits.
+'''
+import unittest
+from unittest import mock
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.limits import rateseodlimitsindex
+from qz.remoterisk.cftc.limits.rateseodlimitsindex import LimitsIndex, getLimitsIndex, invalidateLimitsIndex
+
+CALC_LEVEL = 'VTD+Currency'
+KEY_COLS = ['Level', 'Measure', 'Currency']
+
+LIMITS = [
+    {'Calculation Level': CALC_LEVEL, 'Level': 'GLOBAL RATES', 'Measure': 'IR01', 'Currency': 'USD', 'Limit_Value': 100.0},
+    {'Calculation Level': CALC_LEVEL, 'Level': 'GLOBAL RATES', 'Measure': 'IR01', 'Currency': 'EUR', 'Limit_Value': 50.0},
+    {'Calculation Level': CALC_LEVEL, 'Level': 'APAC LINEAR RATES', 'Measure': 'IR01', 'Currency': 'JPY', 'Limit_Value': 20.0},
+    {'Calculation Level': 'VTD', 'Level': 'GLOBAL RATES', 'Measure': 'IR01', 'Currency': None, 'Limit_Value': 500.0},
+]
+
+
+class LimitsIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LimitsIndex(LIMITS)
+
+    def testForKeysIndexesTheCalcLevel(self):
+        rowsByKey = self.index.forKeys(CALC_LEVEL, KEY_COLS)
+        self.assertEqual(sorted(rowsByKey), [('APAC LINEAR RATES', 'IR01', 'JPY'),
+                                             ('GLOBAL RATES', 'IR01', 'EUR'), ('GLOBAL RATES', 'IR01', 'USD')])
+        self.assertIs(self.index.forKeys(CALC_LEVEL, KEY_COLS), rowsByKey)
+        self.assertTrue(self.index.hasLimits('VTD'))
+        self.assertFalse(self.index.hasLimits('VTD+LETier1'))
+
+    def testJoinReportsUnmatchedKeysOfTheExposureLevels(self):
+        expTable = tableFromListOfDicts([
+            {'Level': 'GLOBAL RATES', 'Measure': 'IR01', 'Currency': 'USD', 'Exposures_USD': 10.0},
+            {'Level': 'GLOBAL RATES', 'Measure': 'IR01', 'Currency': 'USD', 'Exposures_USD': 5.0},
+            {'Level': 'GLOBAL RATES', 'Measure': 'IR01', 'Currency': 'GBP', 'Exposures_USD': 1.0},
+        ])
+        limitsJoin = self.index.join(CALC_LEVEL, expTable, KEY_COLS)
+        self.assertEqual(limitsJoin.matchedKeys, {('GLOBAL RATES', 'IR01', 'USD')})
+        self.assertEqual(limitsJoin.unmatchedExposures, [('GLOBAL RATES', 'IR01', 'GBP')])
+        # the JPY limit is at another level than the exposures and is not reported
+        self.assertEqual(limitsJoin.unmatchedLimits, [('GLOBAL RATES', 'IR01', 'EUR')])
+        self.assertEqual([row[-1] for row in limitsJoin.table.uniqueRows()], [10.0, 5.0])
+
+
+class GetLimitsIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        invalidateLimitsIndex()
+        self.addCleanup(invalidateLimitsIndex)
+
+    def limitsConfig(self, limits):
+        return mock.patch.object(rateseodlimitsindex, 'limitsconfig', mock.Mock(RATESLIMITS=limits))
+
+    def testIndexIsRebuiltWhenLimitsAreReloaded(self):
+        limits = list(LIMITS)
+        with self.limitsConfig(limits):
+            index = getLimitsIndex()
+            self.assertIs(getLimitsIndex(), index)
+            limits.append(dict(LIMITS[0], Currency='GBP'))
+            self.assertIsNot(getLimitsIndex(), index)
+        with self.limitsConfig(list(LIMITS)):
+            self.assertIsNot(getLimitsIndex(), index)
+
+    def testInvalidateAfterEditInPlace(self):
+        limits = [dict(limit) for limit in LIMITS]
+        with self.limitsConfig(limits):
+            index = getLimitsIndex()
+            limits[0]['Limit_Value'] = 200.0
+            self.assertIs(getLimitsIndex(), index)
+            invalidateLimitsIndex()
+            self.assertIsNot(getLimitsIndex(), index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+'''
+Id:          "$Id: rateseodplanner.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the coverage-aware fetch planning of the Rates EOD limits sources.
+'''
+import unittest
+
+from qz.remoterisk.cftc.limits.rateseodplanner import FetchPlan, measureCandidates
+
+DATA_SOURCES = {
+    'cirt_rra': [{'measure_names': ['IR01', 'Vega']}, {'calc_level': ['VTD+Currency']}],
+    'legacy': [{'measure_names': ['IR01', 'Vega', 'Sov Spread Delta']}],
+}
+
+
+def runPlan(plan, missingBySource):
+    '''
+    Walk the plan, every source returns no exposures for the measures listed for it in missingBySource.
+
+    :returns: (source key, measures) fetched, in order
+    :rtype: list
+    '''
+    fetched = []
+    for key, measures in plan:
+        fetched.append((key, measures))
+        plan.record(key, measures, dict((measure, [key]) for measure in measures
+                                        if measure in missingBySource.get(key, [])))
+    return fetched
+
+
+class MeasureCandidatesTest(unittest.TestCase):
+
+    def testSourcesInConfigOrder(self):
+        self.assertEqual(measureCandidates(DATA_SOURCES, {}),
+                         {'IR01': ['cirt_rra', 'legacy'], 'Vega': ['cirt_rra', 'legacy'], 'Sov Spread Delta': ['legacy']})
+
+    def testSourcePriorityComesFirst(self):
+        candidates = measureCandidates(DATA_SOURCES, {'Vega': ['legacy'], 'Sov Spread Delta': ['cirt_rra']})
+        self.assertEqual(candidates['Vega'], ['legacy', 'cirt_rra'])
+        self.assertEqual(candidates['IR01'], ['cirt_rra', 'legacy'])
+        self.assertEqual(candidates['Sov Spread Delta'], ['legacy'])
+
+
+class FetchPlanTest(unittest.TestCase):
+
+    def testCoveredMeasuresAreNotFetchedAgain(self):
+        plan = FetchPlan(DATA_SOURCES)
+        self.assertEqual(runPlan(plan, {}), [('cirt_rra', ['IR01', 'Vega']), ('legacy', ['Sov Spread Delta'])])
+        self.assertEqual(plan.missingMeasures(), {})
+
+    def testMissingMeasureFallsBackToNextSource(self):
+        plan = FetchPlan(DATA_SOURCES)
+        fetched = runPlan(plan, {'cirt_rra': ['Vega']})
+        self.assertEqual(fetched, [('cirt_rra', ['IR01', 'Vega']), ('legacy', ['Sov Spread Delta']), ('legacy', ['Vega'])])
+        self.assertEqual(plan.missingMeasures(), {})
+
+    def testMeasureMissingFromEverySourceIsReported(self):
+        plan = FetchPlan(DATA_SOURCES)
+        runPlan(plan, {'cirt_rra': ['Vega'], 'legacy': ['Vega', 'Sov Spread Delta']})
+        self.assertEqual(plan.missingMeasures(), {'Vega': ['cirt_rra', 'legacy'], 'Sov Spread Delta': ['legacy']})
+
+    def testSourcePriorityOrdersTheRounds(self):
+        plan = FetchPlan(DATA_SOURCES, {'IR01': ['legacy']})
+        fetched = runPlan(plan, {'legacy': ['IR01']})
+        self.assertEqual(fetched, [('cirt_rra', ['Vega']), ('legacy', ['IR01', 'Sov Spread Delta']), ('cirt_rra', ['IR01'])])
+        self.assertEqual(plan.missingMeasures(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
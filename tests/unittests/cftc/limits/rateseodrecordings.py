@@ -0,0 +1,53 @@
+'''
+Id:          "$Id: rateseodrecordings.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the recordings of the Rates EOD source fetches.
+'''
+import os
+import pickle
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from qz.remoterisk.cftc.limits.rateseodrecordings import SourceRecordings, recordedMeasureFetch, sourceRecordings
+
+JOB_TIMESTAMP = datetime.datetime(2025, 8, 15, 15, 1)
+
+
+class SourceRecordingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testRecordingIsReadBack(self):
+        recordings = SourceRecordings(self.root, '20250815', 'GLOBAL RATES', 'cirt_rra')
+        self.assertIsNone(recordings.get('IR01'))
+        recordings.put('IR01', ['snapshot', 'exposures'])
+        self.assertEqual(recordings.get('IR01'), ('snapshot', 'exposures'))
+        self.assertIsNone(SourceRecordings(self.root, '20250815', 'GLOBAL RATES', 'legacy').get('IR01'))
+
+    def testFileOfAnotherFormatIsIgnored(self):
+        recordings = SourceRecordings(self.root, '20250815', 'GLOBAL RATES', 'cirt_rra')
+        os.makedirs(recordings.path)
+        with open(recordings.measurePath('IR01'), 'wb') as f:
+            pickle.dump(('version', ('snapshot', 'exposures')), f)
+        self.assertIsNone(recordings.get('IR01'))
+
+    def testRecordedFetchWritesEveryResult(self):
+        recordings = sourceRecordings({'record_sources_dir': self.root}, 'cirt_rra', 'GLOBAL RATES', JOB_TIMESTAMP)
+        fetch = recordedMeasureFetch(recordings, lambda measure: (measure + ' snapshot', None))
+        self.assertEqual(fetch('IR01'), ('IR01 snapshot', None))
+        self.assertEqual(SourceRecordings(self.root, '20250815', 'GLOBAL RATES', 'cirt_rra').get('IR01'), ('IR01 snapshot', None))
+
+    def testNotRecordedWithoutRecordSourcesDir(self):
+        fetch = lambda measure: (None, None)
+        self.assertIsNone(sourceRecordings({}, 'cirt_rra', 'GLOBAL RATES', JOB_TIMESTAMP))
+        self.assertIs(recordedMeasureFetch(None, fetch), fetch)
+
+
+if __name__ == '__main__':
+    unittest.main()
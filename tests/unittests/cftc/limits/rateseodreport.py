@@ -0,0 +1,46 @@
+'''
+Id:          "$Id: rateseodreport.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the lean HTML body of the Rates EOD limit based check email.
+'''
+import unittest
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.limits.rateseodreport import LimitReport
+
+
+def vtdExpTable(rows):
+    '''
+    Aggregated exposures of a level, rows of (Level, Limit Name, Exposures_USD, Utilization).
+    '''
+    return tableFromListOfDicts([{'Level': level, 'Limit Name': limitName, 'LETier1': 'BANA', 'Measure': 'IR01',
+                                  'Limit Value': 1000.0, 'Exposures_USD': exposure, 'Utilization': utilization,
+                                  'Shift_Name': None}
+                                 for level, limitName, exposure, utilization in rows])
+
+
+class LimitReportTest(unittest.TestCase):
+
+    def testSectionsAreRenderedInLevelOrder(self):
+        report = LimitReport()
+        report.addSection('GLOBAL RATES', vtdExpTable([('GLOBAL RATES', 'IR01 <global>', 1200.0, 120.0)]))
+        report.addSection('AMRS LINEAR RATES', vtdExpTable([('AMRS LINEAR RATES', 'IR01 amrs', 500.0, float('nan'))]))
+        html = report.render(['AMRS LINEAR RATES', 'APAC LINEAR RATES', 'GLOBAL RATES'], '15.01', 'EDT')
+        self.assertLess(html.index('IR01 amrs'), html.index('IR01 &lt;global&gt;'))
+        self.assertNotIn('Shift_Name', html)
+        # breaches are highlighted, a missing utilization is left blank
+        self.assertIn('<tr class="b"><td>GLOBAL RATES</td>', html)
+        self.assertIn('<td class="n">1,200</td><td class="n">120</td></tr>', html)
+        self.assertIn('<td class="n">500</td><td class="n"></td></tr>', html)
+
+    def testSectionOfASharedLevelIsReplaced(self):
+        report = LimitReport()
+        report.addSection('GLOBAL RATES', vtdExpTable([('GLOBAL RATES', 'IR01 limit', 100.0, 10.0)]))
+        report.addSection('GLOBAL RATES', vtdExpTable([('GLOBAL RATES', 'IR01 limit', 300.0, 30.0)]))
+        html = report.render(['GLOBAL RATES'], '15.01', 'EDT')
+        self.assertEqual(html.count('IR01 limit'), 1)
+        self.assertIn('<td class="n">300</td>', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+'''
+Id:          "$Id: rateseodsnapshotstore.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the per-day store of the combined intraday snapshots of the Rates EOD limits.
+'''
+import os
+import math
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.utils.persistence import SNAPSHOTS, SNAPTIME
+from qz.remoterisk.cftc.limits.rateseodsnapshotstore import SnapshotStore, SpilledSnapshots, foldSnapshots, snapLabel
+
+NOON = datetime.datetime(2025, 8, 15, 12, 0)
+ONE_PM = datetime.datetime(2025, 8, 15, 13, 1)
+
+
+def snapshot(rows):
+    return tableFromListOfDicts([{'Book': book, 'Currency': currency, 'IR01_USD': value} for book, currency, value in rows])
+
+def rowsOf(table):
+    return [tuple(row) for row in table.uniqueRows()]
+
+
+class FoldSnapshotsTest(unittest.TestCase):
+
+    def testSnapLabel(self):
+        self.assertEqual(snapLabel(NOON), '12PM')
+        self.assertEqual(snapLabel(ONE_PM), '1PM')
+
+    def testEarlierExposuresAreLabelledAndJoined(self):
+        earlier = {SNAPSHOTS: {'IR01': snapshot([('B1', 'USD', 1.0), ('B2', 'EUR', 2.0)])}, SNAPTIME: NOON}
+        current = {SNAPSHOTS: {'IR01': snapshot([('B1', 'USD', 3.0), ('B3', 'JPY', 4.0)])}, SNAPTIME: ONE_PM}
+        combined = foldSnapshots(earlier, current)
+        self.assertEqual(combined[SNAPTIME], ONE_PM)
+        table = combined[SNAPSHOTS]['IR01']
+        self.assertEqual(list(table.columnNames()), ['Book', 'Currency', 'IR01_USD 12PM', 'IR01_USD'])
+        # rows of only one snap are dropped, as in the views of combineWithEarlierSnapshots
+        self.assertEqual(rowsOf(table), [('B1', 'USD', 1.0, 3.0)])
+
+    def testNewMeasureIsKeptAsIs(self):
+        vega = tableFromListOfDicts([{'Book': 'B1', 'Vega_USD': 5.0}])
+        earlier = {SNAPSHOTS: {}, SNAPTIME: NOON}
+        combined = foldSnapshots(earlier, {SNAPSHOTS: {'Vega': vega}, SNAPTIME: ONE_PM})
+        self.assertIs(combined[SNAPSHOTS]['Vega'], vega)
+
+    def testMissingMeasureGetsAnEmptyCurrentColumn(self):
+        earlier = {SNAPSHOTS: {'IR01': snapshot([('B1', 'USD', 1.0)])}, SNAPTIME: NOON}
+        combined = foldSnapshots(earlier, {SNAPSHOTS: {}, SNAPTIME: ONE_PM})
+        table = combined[SNAPSHOTS]['IR01']
+        self.assertEqual(list(table.columnNames()), ['Book', 'Currency', 'IR01_USD 12PM', 'IR01_USD'])
+        [row] = rowsOf(table)
+        self.assertEqual(row[:3], ('B1', 'USD', 1.0))
+        self.assertTrue(math.isnan(row[3]))
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testLatestBeforeReadsThePreviousRunHour(self):
+        store = SnapshotStore(self.root, NOON.date(), 'GLOBAL RATES')
+        self.assertIsNone(store.latestBefore(12))
+        store.append(12, {SNAPSHOTS: {}, SNAPTIME: NOON})
+        store.append(15, {SNAPSHOTS: {}, SNAPTIME: ONE_PM})
+        self.assertIsNone(store.latestBefore(12))
+        self.assertEqual(store.latestBefore(13)[SNAPTIME], NOON)
+        self.assertEqual(store.latestBefore(16)[SNAPTIME], ONE_PM)
+
+
+class SpilledSnapshotsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testLevelsAreReadBackInAddOrder(self):
+        spilled = SpilledSnapshots(self.root, NOON.date(), 15)
+        spilled.write('GLOBAL RATES', {'IR01': 'GLOBAL RATES IR01'})
+        spilled.write('AMRS LINEAR RATES', {'IR01': 'AMRS LINEAR RATES IR01'})
+        # written but not added yet, e.g. by a VTD still being merged
+        self.assertNotIn('GLOBAL RATES', spilled)
+        spilled.add('AMRS LINEAR RATES')
+        spilled.add('GLOBAL RATES')
+        spilled.add('GLOBAL RATES')
+        self.assertEqual(list(spilled), ['AMRS LINEAR RATES', 'GLOBAL RATES'])
+        self.assertEqual(dict(spilled.items()), {'GLOBAL RATES': {'IR01': 'GLOBAL RATES IR01'},
+                                                 'AMRS LINEAR RATES': {'IR01': 'AMRS LINEAR RATES IR01'}})
+        spilled.remove()
+        self.assertFalse(os.path.exists(spilled.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+'''
+Id:          "$Id: rateseodstandins.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the local stand-in backends of the Rates EOD sources.
+'''
+import random
+import shutil
+import tempfile
+import unittest
+
+from qz.data.qztable_utils import tableFromListOfDicts
+from qz.remoterisk.cftc.limits.rateseodrecordings import SourceRecordings
+from qz.remoterisk.cftc.limits.rateseodstandins import StandInSource, StandInSourceError, LatencyModel
+
+
+class Book(object):
+    '''
+    Synthetic book serving a single row per measure.
+    '''
+
+    def legacyTable(self, vtd, measure):
+        return tableFromListOfDicts([{'TradingDesk': vtd, 'Exposures_USD': 1.0}])
+
+
+class StandInSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testInjectedFailure(self):
+        source = StandInSource('cirt_rra', {'failure_rate': 1.0}, Book())
+        with self.assertRaises(StandInSourceError):
+            source.fetchMeasure('GLOBAL RATES', 'IR01')
+
+    def testEmptyMeasures(self):
+        source = StandInSource('cirt_rra', {'empty_measures': {'GLOBAL RATES': ['Vega'], 'AMRS LINEAR RATES': '*'}}, Book())
+        self.assertEqual(source.fetchMeasure('GLOBAL RATES', 'Vega'), (None, None))
+        self.assertEqual(source.fetchMeasure('AMRS LINEAR RATES', 'IR01'), (None, None))
+        snapshot, exposures = source.fetchMeasure('GLOBAL RATES', 'IR01')
+        self.assertEqual(list(exposures.columnNames()), ['TradingDesk', 'Exposures_USD', 'Measure'])
+
+    def testRecordedExposuresAreReplayed(self):
+        SourceRecordings(self.root, '20250815', 'GLOBAL RATES', 'cirt_rra').put('IR01', ('snapshot', 'exposures'))
+        source = StandInSource('cirt_rra', {}, Book(), self.root, '20250815')
+        self.assertEqual(source.fetchMeasure('GLOBAL RATES', 'IR01'), ('snapshot', 'exposures'))
+        # measures without recording fall back to the synthetic book
+        snapshot, exposures = source.fetchMeasure('GLOBAL RATES', 'Vega')
+        self.assertEqual(list(snapshot.columnNames()), ['TradingDesk', 'Exposures_USD'])
+
+
+class LatencyModelTest(unittest.TestCase):
+
+    def testFixedAndUniform(self):
+        rand = random.Random(0)
+        self.assertEqual(LatencyModel('legacy', {'seconds': 0.5}, rand).sample('GLOBAL RATES', 'IR01'), 0.5)
+        latency = LatencyModel('legacy', {'distribution': 'uniform', 'min_seconds': 1.0, 'max_seconds': 2.0}, rand)
+        self.assertTrue(all(1.0 <= latency.sample('GLOBAL RATES', 'IR01') <= 2.0 for i in range(20)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+'''
+Id:          "$Id: rateseodtimings.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the per-stage timings and run manifest of the Rates EOD limits run.
+'''
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+from qz.remoterisk.cftc.limits.rateseodtimings import RunManifest, startManifest, finishManifest, currentManifest,\
+    timed, timedCall
+
+
+class RunManifestTest(unittest.TestCase):
+
+    def testTotalsPerStage(self):
+        manifest = RunManifest('test_rates_eod_yaml_mapping')
+        manifest.record('fetch_measure', 1.0, rows=10, vtd='GLOBAL RATES', measure='IR01')
+        manifest.record('fetch_measure', 3.0, rows=5, vtd='GLOBAL RATES', measure='Vega')
+        manifest.record('write_exposures', 2.0)
+        self.assertEqual(manifest.totals(), {'fetch_measure': {'calls': 2, 'seconds': 4.0, 'max_seconds': 3.0, 'rows': 15},
+                                             'write_exposures': {'calls': 1, 'seconds': 2.0, 'max_seconds': 2.0, 'rows': 0}})
+        self.assertEqual(manifest.stages[0], {'stage': 'fetch_measure', 'seconds': 1.0, 'rows': 10, 'vtd': 'GLOBAL RATES', 'measure': 'IR01'})
+
+    def testManifestIsWrittenAsJson(self):
+        directory = tempfile.mkdtemp()
+        try:
+            manifest = RunManifest('test_rates_eod_yaml_mapping')
+            manifest.record('alert_email', 0.5)
+            with open(manifest.write(directory)) as f:
+                written = json.load(f)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.assertEqual(written['config'], 'test_rates_eod_yaml_mapping')
+        self.assertEqual(written['stages'], [{'stage': 'alert_email', 'seconds': 0.5}])
+
+
+class TimedTest(unittest.TestCase):
+
+    def tearDown(self):
+        finishManifest()
+
+    def testNothingRecordedWithoutManifest(self):
+        with timed('fetch_measure') as timing:
+            timing['rows'] = 10
+        self.assertIsNone(currentManifest())
+
+    def testStagesRecordedFromThreads(self):
+        manifest = startManifest('test_rates_eod_yaml_mapping')
+        with timed('determine_exposure') as timing:
+            timing['rows'] = 3
+        fetch = timedCall('fetch_measure', lambda measure: measure, vtd='GLOBAL RATES')
+        threads = [threading.Thread(target=fetch, args=(measure,)) for measure in ('IR01', 'Vega')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIs(finishManifest(), manifest)
+        self.assertIsNone(currentManifest())
+        self.assertEqual(manifest.stages[0]['rows'], 3)
+        self.assertEqual(manifest.totals()['fetch_measure']['calls'], 2)
+        self.assertEqual(set(entry.get('vtd') for entry in manifest.stages[1:]), {'GLOBAL RATES'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+'''
+Id:          "$Id: rateseodwriter.py,v 1.1 2025/10/17 00:00:00 Exp $"
+Copyright:   Copyright (c) 2023 Bank of America Merrill Lynch, All Rights Reserved
+Description: Tests of the write-behind queue of the Rates EOD limits sandra writes.
+'''
+import threading
+import unittest
+
+from qz.remoterisk.cftc.limits.rateseodwriter import WriteBehindQueue
+
+
+class WriteBehindQueueTest(unittest.TestCase):
+
+    def testWritesRunInSubmissionOrder(self):
+        written = []
+        writer = WriteBehindQueue(maxsize=1)
+        for level in ['AMRS LINEAR RATES', 'APAC LINEAR RATES', 'GLOBAL RATES']:
+            writer.submit(level, written.append, level)
+        self.assertEqual(writer.flush(), {})
+        self.assertEqual(written, ['AMRS LINEAR RATES', 'APAC LINEAR RATES', 'GLOBAL RATES'])
+
+    def testFailedWriteIsReportedAndLaterWritesRun(self):
+        written = []
+        error = RuntimeError('sandra write failed')
+
+        def failingWrite(level):
+            raise error
+
+        writer = WriteBehindQueue()
+        writer.submit('AMRS LINEAR RATES', failingWrite, 'AMRS LINEAR RATES')
+        writer.submit('GLOBAL RATES', written.append, 'GLOBAL RATES')
+        self.assertEqual(writer.flush(), {'AMRS LINEAR RATES': error})
+        self.assertEqual(written, ['GLOBAL RATES'])
+
+    def testFlushWaitsForPendingWrites(self):
+        release = threading.Event()
+        written = []
+
+        def slowWrite(level):
+            release.wait(5)
+            written.append(level)
+
+        writer = WriteBehindQueue()
+        writer.submit('GLOBAL RATES', slowWrite, 'GLOBAL RATES')
+        threading.Timer(0.1, release.set).start()
+        writer.flush()
+        self.assertEqual(written, ['GLOBAL RATES'])
+        self.assertFalse(writer.thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()